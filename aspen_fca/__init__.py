@@ -0,0 +1,38 @@
+"""
+ASPEN FCA: summarizes ASPEN OneLiner relay operations for all faults.
+The functions below parse saved TTY window text into fault DataFrames & export them without dialogs or ASPEN OneLiner, e.g.
+    faults = aspen_fca.clean_tty_text("TTY Window.txt")
+    aspen_fca.write_faults("Fault Summary.xlsx", faults)
+Heavy packages (numpy, pandas, openpyxl, pyarrow) are only imported by the calls that need them.
+"""
+from .analysis import compare_faults, coordinate_faults, summarize_faults
+from .export import create_xlsx, load_fault_study, read_faults, write_faults
+from .excel import write_xlsx, write_xlsx_sheets
+from .metrics import StageMetrics
+from .parsing import clean_tty_text, detect_curve_type, get_fault_descriptions, get_fault_table, merge_faults, read_fault_section, split_fault_section
+from .store import query_store, store_faults
+from .zones import check_impedance_zones, read_zone_settings
+
+__all__ = [
+    "StageMetrics",
+    "check_impedance_zones",
+    "clean_tty_text",
+    "compare_faults",
+    "coordinate_faults",
+    "create_xlsx",
+    "detect_curve_type",
+    "get_fault_descriptions",
+    "get_fault_table",
+    "load_fault_study",
+    "merge_faults",
+    "query_store",
+    "read_fault_section",
+    "read_faults",
+    "read_zone_settings",
+    "split_fault_section",
+    "store_faults",
+    "summarize_faults",
+    "write_faults",
+    "write_xlsx",
+    "write_xlsx_sheets",
+]
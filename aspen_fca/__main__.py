@@ -0,0 +1,9 @@
+"""
+Runs the command line: python -m aspen_fca [command]
+"""
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
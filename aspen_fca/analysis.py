@@ -0,0 +1,197 @@
+"""
+Summaries, fault study comparisons & relay coordination checks of fault data.
+"""
+from .parsing import round_differences, share_categories, widen_measurements
+
+# Fault data columns summarized: their label in the summary & whether percentiles are included
+SUMMARY_MEASURES = {
+    "Impedance (Magnitude - Ohms secondary)": ("Impedance (Ohms secondary)", True),
+    "Operate Time (s)": ("Operate Time (s)", False),
+    "Fault Current (3I0 - A)": ("Fault Current (3I0 - A)", False)
+}
+# Columns the faults are broken down by, after the row for all faults
+SUMMARY_GROUPS = ("Faulted Line", "Fault Type", "Operate Zone", "Branch Outage")
+SUMMARY_PERCENTILES = (0.1, 0.5, 0.9)
+
+def summarize_faults(dataframe, group_columns=SUMMARY_GROUPS, percentiles=SUMMARY_PERCENTILES):
+    """ Gets the fault count, minimum, maximum & impedance percentiles of all faults, then of each value of every group column present.
+    Each breakdown is one groupby pass over the measurement columns. Works for Distance & Overcurrent Curve fault data. """
+    import numpy as np
+    import pandas as pd
+    measures = [column for column in SUMMARY_MEASURES if column in dataframe.columns]
+    # Widened first, so minimums, maximums & percentiles all come from the parsed values
+    values = pd.DataFrame({column: widen_measurements(dataframe[column]) for column in measures}, index=dataframe.index)
+    sections = []
+    for group_by in ("All Faults",) + tuple(column for column in group_columns if column in dataframe.columns):
+        if group_by == "All Faults":
+            keys = pd.Categorical.from_codes(np.zeros(len(dataframe), dtype="int8"), ["All"])
+        else:
+            keys = dataframe[group_by]
+        grouped = values.groupby(keys, observed=True)
+        section = pd.DataFrame({"Faults": grouped.size()})
+        if measures:
+            extremes = grouped.agg(["min", "max"])
+        for column in measures:
+            label, with_percentiles = SUMMARY_MEASURES[column]
+            section[f"Min {label}"] = extremes[(column, "min")]
+            if with_percentiles and percentiles:
+                quantiles = grouped[column].quantile(list(percentiles)).unstack()
+                for percentile in percentiles:
+                    section[f"P{percentile * 100:g} {label}"] = quantiles[percentile]
+            section[f"Max {label}"] = extremes[(column, "max")]
+        # Sort groups by name, not by order of first appearance
+        section.index = section.index.astype(str)
+        section = section.sort_index().rename(index={"": "(none)"}).rename_axis("Group").reset_index()
+        section.insert(0, "Group By", group_by)
+        sections.append(section)
+    return pd.concat(sections, ignore_index=True)
+
+# Columns that identify the same fault in two fault studies, together with the relay when both have one
+COMPARE_KEY_COLUMNS = ("Fault Sim", "Faulted Line", "Fault Type", "Branch Outage")
+# Smallest change reported for each measurement
+COMPARE_THRESHOLDS = {
+    "Operate Time (s)": 0.01,
+    "Impedance (Magnitude - Ohms secondary)": 0.01,
+    "Fault Current (3I0 - A)": 1.0
+}
+COMPARE_LABELS = {
+    "Operate Time (s)": "Operate Time",
+    "Impedance (Magnitude - Ohms secondary)": "Impedance",
+    "Fault Current (3I0 - A)": "Fault Current"
+}
+
+def get_fault_keys(dataframe, key_columns):
+    """ Hashes the key columns of each fault. Faults with the same key are numbered in order, so repeats still match one to one. """
+    import pandas as pd
+    keys = pd.util.hash_pandas_object(dataframe[key_columns], index=False).to_numpy()
+    repeats = pd.Series(keys).groupby(keys, sort=False).cumcount().to_numpy()
+    return pd.MultiIndex.from_arrays([keys, repeats], names=["Key", "Repeat"])
+
+def compare_faults(before, after, thresholds=None):
+    """ Matches the faults of two fault studies on a hashed key index & finds faults added, removed, with a different operate zone,
+    or with an operate time / impedance / fault current change over its threshold. Returns a row per changed fault & the count of each change. """
+    import numpy as np
+    import pandas as pd
+    thresholds = dict(COMPARE_THRESHOLDS, **(thresholds or {}))
+    key_columns = [column for column in ("Relay",) + COMPARE_KEY_COLUMNS if column in before.columns and column in after.columns]
+    value_columns = [column for column in ("Fault #", "Operate Zone") + tuple(COMPARE_THRESHOLDS) if column in before.columns and column in after.columns]
+
+    # Row numbers are carried through the join so key columns are only looked up for changed faults
+    sides = []
+    for frame in (before, after):
+        side = frame[value_columns].set_axis(get_fault_keys(frame, key_columns))
+        side.insert(0, "Row", np.arange(len(frame)))
+        sides.append(side)
+    share_categories(sides)
+    joined = sides[0].join(sides[1], how='outer', lsuffix=" Before", rsuffix=" After")
+
+    in_before = joined["Row Before"].notna().to_numpy()
+    in_after = joined["Row After"].notna().to_numpy()
+    both = in_before & in_after
+    changes = {"Added": ~in_before, "Removed": ~in_after}
+    if "Operate Zone" in value_columns:
+        changes["Zone"] = both & (joined["Operate Zone Before"] != joined["Operate Zone After"]).to_numpy()
+    measurements = {}
+    for column in COMPARE_THRESHOLDS:
+        if column in value_columns:
+            before_values = widen_measurements(joined[f"{column} Before"])
+            after_values = widen_measurements(joined[f"{column} After"])
+            # Rounded so a change of exactly the threshold, e.g. 0.30 to 0.31 s, is never reported
+            differences = round_differences(after_values - before_values)
+            measurements[column] = (before_values, after_values, differences)
+            with np.errstate(invalid="ignore"):
+                changes[COMPARE_LABELS[column]] = both & (np.abs(differences) > thresholds[column])
+    changed = np.logical_or.reduce(list(changes.values()))
+
+    # Report changed faults in fault number order, added faults last
+    rows = joined[changed]
+    flag_rows = zip(*(flags[changed] for flags in changes.values()))
+    report = {"Change": [", ".join(label for label, flag in zip(changes, row) if flag) for row in flag_rows]}
+    before_rows = rows["Row Before"].to_numpy()
+    after_rows = rows["Row After"].to_numpy()
+    from_before = ~np.isnan(before_rows)
+    for column in key_columns:
+        values = np.empty(len(rows), dtype=object)
+        values[from_before] = before[column].iloc[before_rows[from_before].astype(np.intp)].to_numpy(dtype=object)
+        values[~from_before] = after[column].iloc[after_rows[~from_before].astype(np.intp)].to_numpy(dtype=object)
+        report[column] = values
+    for side in ("Before", "After"):
+        report[f"Fault # {side}"] = rows[f"Fault # {side}"].astype("Int32").array
+    if "Operate Zone" in value_columns:
+        for side in ("Before", "After"):
+            report[f"Operate Zone {side}"] = rows[f"Operate Zone {side}"].array
+    for column, (before_values, after_values, differences) in measurements.items():
+        report[f"{column} Before"] = before_values[changed]
+        report[f"{column} After"] = after_values[changed]
+        report[f"{COMPARE_LABELS[column]} Change"] = differences[changed]
+    report = pd.DataFrame(report)
+    report = report.sort_values(["Fault # Before", "Fault # After"], na_position="last", kind="stable", ignore_index=True)
+    return report, {label: int(flags.sum()) for label, flags in changes.items()}
+
+# Smallest coordination time interval between a primary relay & its backup, in seconds
+COORDINATION_CTI = 0.3
+# Smallest operate time of each delayed distance zone, in seconds
+COORDINATION_ZONE_TIMERS = {"Z2": 0.3, "Z3": 0.9}
+COORDINATION_SIDES = ("Primary", "Backup")
+
+def get_zone_timers(zones, zone_timers):
+    """ Looks up the zone timer of each operate zone by category code. Faults without a zone or timer get NaN. """
+    import numpy as np
+    categories = [str(zone).strip() for zone in zones.cat.categories]
+    # Code -1 (no operate zone) picks the NaN at the end
+    timers = np.array([zone_timers.get(zone, np.nan) for zone in categories] + [np.nan])
+    return timers[zones.cat.codes.to_numpy()]
+
+def coordinate_faults(primary, backup, cti=COORDINATION_CTI, zone_timers=None):
+    """ Matches the faults seen by a primary relay & its backup on their fault keys, then finds the coordination time interval of every fault.
+    Flags faults where both relays operate less than cti apart, or where a relay operates in a delayed zone before its zone timer.
+    Returns a row per matched fault & the count of each violation. """
+    import numpy as np
+    import pandas as pd
+    zone_timers = COORDINATION_ZONE_TIMERS if zone_timers is None else zone_timers
+    key_columns = [column for column in COMPARE_KEY_COLUMNS if column in primary.columns and column in backup.columns]
+    value_columns = [column for column in ("Fault #", "Operate Zone", "Operate Time (s)") if column in primary.columns and column in backup.columns]
+    if "Operate Time (s)" not in value_columns:
+        raise ValueError("ERROR: Both relays need operate times to check coordination.")
+
+    # Only the faults in both studies can be checked; row numbers are carried through the join
+    sides = []
+    for frame in (primary, backup):
+        side = frame[value_columns].set_axis(get_fault_keys(frame, key_columns))
+        side.insert(0, "Row", np.arange(len(frame)))
+        sides.append(side)
+    joined = sides[0].join(sides[1], how="inner", lsuffix=" Primary", rsuffix=" Backup").sort_values("Row Primary", kind="stable")
+    unmatched = len(primary) + len(backup) - 2 * len(joined)
+
+    times = {side: widen_measurements(joined[f"Operate Time (s) {side}"]) for side in COORDINATION_SIDES}
+    # Rounded so 0.7 - 0.4 is not a violation of a 0.3 s interval
+    margins = round_differences(times["Backup"] - times["Primary"])
+    violations = {}
+    with np.errstate(invalid="ignore"):
+        violations["CTI"] = margins < cti
+        if "Operate Zone" in value_columns:
+            for side in COORDINATION_SIDES:
+                violations[f"{side} Zone Timer"] = times[side] < get_zone_timers(joined[f"Operate Zone {side}"], zone_timers)
+    violated = np.logical_or.reduce(list(violations.values()))
+
+    primary_rows = joined["Row Primary"].to_numpy()
+    report = {column: primary[column].iloc[primary_rows].array for column in key_columns}
+    for side in COORDINATION_SIDES:
+        report[f"Fault # {side}"] = joined[f"Fault # {side}"].to_numpy()
+    for side in COORDINATION_SIDES:
+        if "Operate Zone" in value_columns:
+            report[f"Operate Zone {side}"] = joined[f"Operate Zone {side}"].array
+        report[f"Operate Time {side} (s)"] = times[side]
+    report["CTI (s)"] = margins
+    # Only violating faults get a label
+    labels = np.full(len(joined), "", dtype=object)
+    flag_rows = zip(*(flags[violated] for flags in violations.values()))
+    labels[violated] = [", ".join(label for label, flag in zip(violations, row) if flag) for row in flag_rows]
+    report["Violation"] = labels
+    counts = {"Checked": len(joined), "Unmatched": unmatched}
+    counts.update({label: int(flags.sum()) for label, flags in violations.items()})
+    return pd.DataFrame(report), counts
+
+def get_coordination_cells(counts):
+    """ Gets the summary cells of a coordination sheet """
+    return [(f"{label} Faults" if label in ("Checked", "Unmatched") else f"{label} Violations", count) for label, count in counts.items()]
@@ -0,0 +1,493 @@
+"""
+Drives ASPEN OneLiner windows & menus through pywinauto, or replays a recorded session. Also holds the dialogs of an interactive run.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from .export import DEFAULT_SUMMARY_NAME
+from .metrics import StageMetrics
+from .watch import WATCH_DEBOUNCE_SECONDS, get_file_signature
+
+def get_txt_file(directory, message):
+    """ Opens a window to select a text file """
+    import tkinter
+    import tkinter.filedialog
+    root = tkinter.Tk()
+    # Hide the main window
+    root.withdraw() 
+    # Window on top
+    root.attributes('-topmost', True)
+    root.lift()
+    root.focus_force() 
+    root.update()
+    file = tkinter.filedialog.askopenfilename(title=message, initialdir=directory, filetypes=[("Text files", "*.TXT *.txt"), ("Compressed text files", "*.gz *.xz *.zst *.zip")])
+    root.destroy()
+    return file
+
+def ask_file_name(message):
+    """ Opens a window to enter a file name """
+    import tkinter
+    import tkinter.simpledialog
+    root = tkinter.Tk()
+    # Hide the main window
+    root.withdraw()
+    # Window on top
+    root.attributes('-topmost', True)
+    root.lift()
+    root.focus_force() 
+
+    file_name = tkinter.simpledialog.askstring(
+    title="File Name",
+    prompt=message
+    )
+    if not file_name:
+        # Use default
+        file_name = DEFAULT_SUMMARY_NAME
+    root.destroy()
+    return file_name
+
+class OneLinerConnectionError(Exception):
+    """ ASPEN OneLiner or one of its windows could not be reached """
+
+class OneLinerMenuError(Exception):
+    """ An ASPEN OneLiner menu item could not be selected """
+
+def wait_until(condition, timeout, initial_delay=0.02, max_delay=0.25):
+    """ Waits for condition() to return a truthy value, checking less often the longer it takes. Returns the value or raises TimeoutError. """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        result = condition()
+        if result:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Condition not met within {timeout} seconds")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+class OneLinerBackend(ABC):
+    """ Window & menu interactions with ASPEN OneLiner, addressed by window name ("main", "distance", "overcurrent", "relay_curve_select", "tty", "save_dialog") """
+
+    @abstractmethod
+    def connect(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def window_exists(self, window):
+        raise NotImplementedError
+
+    @abstractmethod
+    def close_window(self, window):
+        raise NotImplementedError
+
+    @abstractmethod
+    def focus_window(self, window):
+        raise NotImplementedError
+
+    @abstractmethod
+    def menu_select(self, window, path):
+        raise NotImplementedError
+
+    @abstractmethod
+    def watch_save_dialog(self, timeout):
+        """ Follows the folder shown in the save dialog until it closes. Returns the last folder ("" if none). """
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_relay(self, relay):
+        """ Picks a relay in the relay curve selection window & confirms it """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_tty_text(self, path):
+        """ Saves the selected TTY text to path through the open save dialog """
+        raise NotImplementedError
+
+    def wait_for_window(self, windows, timeout):
+        """ Waits for the first of the windows to open. Returns its name. """
+        return wait_until(lambda: next((window for window in windows if self.window_exists(window)), None), timeout)
+
+    def wait_for_window_closed(self, window, timeout):
+        wait_until(lambda: not self.window_exists(window), timeout)
+
+class PywinautoBackend(OneLinerBackend):
+    """ Drives a running ASPEN OneLiner through pywinauto """
+    # Assumes the title of windows contains phrases below
+    WINDOW_TITLES = {
+        "main": ".*ASPEN OneLiner.*",
+        "distance": ".*Distance.*",
+        "overcurrent": ".*Overcurrent.*",
+        "relay_curve_select": ".*Show Relay Curve.*",
+        "tty": ".*TTY.*",
+        "save_dialog": ".*Write Selected Text To.*",
+    }
+
+    def __init__(self):
+        # Only needed for a live ASPEN OneLiner session, not for batch runs
+        from pywinauto import ElementNotFoundError
+        from pywinauto.application import Application
+        from pywinauto.controls.menuwrapper import MenuItemNotEnabled
+        self.application_class = Application
+        self.not_found_error = ElementNotFoundError
+        self.not_enabled_error = MenuItemNotEnabled
+        self.app = None
+
+    def _window(self, window):
+        return self.app.window(title_re=self.WINDOW_TITLES[window])
+
+    def connect(self):
+        # Requires ASPEN Oneliner to already be running
+        try:
+            self.app = self.application_class(backend="win32").connect(title_re=self.WINDOW_TITLES["main"])
+        except self.not_found_error as e:
+            raise OneLinerConnectionError(e) from e
+
+    def window_exists(self, window):
+        return self._window(window).exists(timeout=0)
+
+    def close_window(self, window):
+        self._window(window).close()
+
+    def focus_window(self, window):
+        self._window(window).set_focus()
+
+    def menu_select(self, window, path):
+        try:
+            self._window(window).menu_select(path)
+        except self.not_found_error as e:
+            raise OneLinerConnectionError(e) from e
+        except self.not_enabled_error as e:
+            raise OneLinerMenuError(e) from e
+
+    def wait_for_window(self, windows, timeout):
+        window = super().wait_for_window(windows, timeout)
+        self._window(window).wait("visible", timeout=10)
+        return window
+
+    def watch_save_dialog(self, timeout):
+        file_dialog = self._window("save_dialog")
+        # Address bar
+        address_bar = file_dialog.child_window(title_re="Address:.*", class_name="ToolbarWindow32")
+        folder_path = ""
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while time.monotonic() < deadline and file_dialog.exists(timeout=0):
+            try:
+                # Get folder path
+                folder_texts = address_bar.texts()
+            except Exception:
+                folder_texts = []
+            if folder_texts and folder_texts[0].strip() != folder_path:
+                # Check quickly again while the user is browsing
+                folder_path = folder_texts[0].strip()
+                delay = 0.02
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+        return folder_path
+
+    def select_relay(self, relay):
+        dialog = self._window("relay_curve_select")
+        try:
+            dialog.child_window(class_name="ListBox").select(relay)
+        except (ValueError, IndexError) as e:
+            raise OneLinerMenuError(f"Relay '{relay}' not found: {e}") from e
+        dialog.child_window(title="OK", class_name="Button").click()
+
+    def save_tty_text(self, path):
+        dialog = self._window("save_dialog")
+        dialog.child_window(class_name="Edit", found_index=0).set_edit_text(str(path))
+        dialog.child_window(title_re="&?Save", class_name="Button").click()
+
+class FakeOneLinerBackend(OneLinerBackend):
+    """ Replays a recorded ASPEN OneLiner session in-process, for timing & regression runs without Windows """
+    RELAY_CURVE_MENU = "Relay->View Relay Curve and Logic Scheme..."
+    TTY_WINDOW_MENU = "View->TTY Window"
+    SAVE_TEXT_MENU = "TTY->Save Selected Text..."
+
+    def __init__(self, tty_text, curve="distance", save_folder=None, save_name="TTY Window.txt", delays=None, disabled_menus=(), connect_error=False, relays=None, user_actions=True):
+        for relay_curve in [curve] + [relay_curve for _, relay_curve in (relays or {}).values()]:
+            if relay_curve not in ("distance", "overcurrent"):
+                raise ValueError(f"ERROR: Unknown relay curve '{relay_curve}'")
+        # TTY text & curve of the relay picked by the recorded user, until a sweep selects another relay
+        self.tty_text = tty_text
+        self.curve = curve
+        # Relay name -> (TTY text, curve) for sweeps
+        self.relays = relays or {}
+        self.save_folder = Path(save_folder) if save_folder else None
+        self.save_name = save_name
+        # Seconds the recorded user took at each step & ASPEN OneLiner took to draw a selected relay curve
+        self.delays = {"relay_curve": 0.0, "save_dialog": 0.0, "user_save": 0.0, "curve_draw": 0.0}
+        self.delays.update(delays or {})
+        self.disabled_menus = set(disabled_menus)
+        self.connect_error = connect_error
+        # Window name -> time it becomes visible
+        self.open_windows = {}
+        # Whether the recorded user picks the relay & saves the TTY text, off when the program drives both (sweeps)
+        self.user_actions = user_actions
+        self.pick_time = None
+        self.save_time = None
+        self.saved_path = None
+        self.menu_log = []
+
+    @classmethod
+    def from_recording(cls, recording_path, save_folder=None, user_actions=True):
+        """ Loads a recorded session: {"tty_file", "curve", "save_folder", "save_name", "delays", "disabled_menus", "connect_error", "relays"}.
+        Sweep recordings list "relays" as [{"name", "tty_file", "curve"}]. TTY files are relative to the recording. """
+        recording_path = Path(recording_path)
+        with open(recording_path, "r", encoding="utf-8") as file:
+            recording = json.load(file)
+        relays = {}
+        for relay in recording.get("relays", []):
+            with open(recording_path.parent / relay["tty_file"], "r", encoding="utf-8") as file:
+                relays[relay["name"]] = (file.read(), relay.get("curve", "distance"))
+        if "tty_file" in recording:
+            with open(recording_path.parent / recording["tty_file"], "r", encoding="utf-8") as file:
+                tty_text, curve = file.read(), recording.get("curve", "distance")
+        elif relays:
+            # The recorded user picks the first relay
+            tty_text, curve = next(iter(relays.values()))
+        else:
+            raise ValueError(f"ERROR: Recording '{recording_path}' has no tty_file.")
+        return cls(tty_text,
+                   curve=curve,
+                   save_folder=save_folder or recording.get("save_folder"),
+                   save_name=recording.get("save_name", "TTY Window.txt"),
+                   delays=recording.get("delays"),
+                   disabled_menus=recording.get("disabled_menus", ()),
+                   connect_error=recording.get("connect_error", False),
+                   relays=relays,
+                   user_actions=user_actions)
+
+    def _update(self):
+        # The recorded user picks a relay in the relay curve selection window
+        if self.pick_time is not None and time.monotonic() >= self.pick_time:
+            self.pick_time = None
+            self.open_windows.pop("relay_curve_select", None)
+            self.open_windows[self.curve] = time.monotonic()
+        # The recorded user saves the TTY text & closes the dialog
+        if self.save_time is not None and time.monotonic() >= self.save_time:
+            self.save_time = None
+            if self.save_folder is None:
+                self.save_folder = Path(tempfile.mkdtemp(prefix="ASPEN FCA "))
+            self.saved_path = self.save_folder / self.save_name
+            with open(self.saved_path, "w", encoding="utf-8") as file:
+                file.write(self.tty_text)
+            self.open_windows.pop("save_dialog", None)
+
+    def connect(self):
+        if self.connect_error:
+            raise OneLinerConnectionError("No window matching '.*ASPEN OneLiner.*'")
+        self.open_windows["main"] = time.monotonic()
+
+    def window_exists(self, window):
+        # Checked before the recorded user acts, so a dialog the user closes without delay is still seen open once
+        exists = self.open_windows.get(window, float("inf")) <= time.monotonic()
+        self._update()
+        return exists
+
+    def close_window(self, window):
+        self.open_windows.pop(window, None)
+
+    def focus_window(self, window):
+        if not self.window_exists(window):
+            raise OneLinerConnectionError(f"No window named '{window}'")
+
+    def menu_select(self, window, path):
+        self.menu_log.append((window, path))
+        if not self.window_exists(window):
+            raise OneLinerConnectionError(f"No window named '{window}'")
+        if path in self.disabled_menus:
+            raise OneLinerMenuError(f"MenuItem '{path}' is not enabled")
+        now = time.monotonic()
+        if path == self.RELAY_CURVE_MENU:
+            self.open_windows["relay_curve_select"] = now
+            if self.user_actions:
+                self.pick_time = now + self.delays["relay_curve"]
+        elif path == self.TTY_WINDOW_MENU:
+            self.open_windows["tty"] = now
+        elif path == self.SAVE_TEXT_MENU:
+            self.open_windows["save_dialog"] = now + self.delays["save_dialog"]
+            if self.user_actions:
+                self.save_time = self.open_windows["save_dialog"] + self.delays["user_save"]
+
+    def watch_save_dialog(self, timeout):
+        try:
+            self.wait_for_window_closed("save_dialog", timeout)
+        except TimeoutError:
+            pass
+        return str(self.save_folder) if self.saved_path else ""
+
+    def select_relay(self, relay):
+        if not self.window_exists("relay_curve_select"):
+            raise OneLinerConnectionError("No window named 'relay_curve_select'")
+        if relay not in self.relays:
+            raise OneLinerMenuError(f"Relay '{relay}' not found")
+        self.pick_time = None
+        self.open_windows.pop("relay_curve_select")
+        self.tty_text, self.curve = self.relays[relay]
+        self.open_windows[self.curve] = time.monotonic() + self.delays["curve_draw"]
+
+    def save_tty_text(self, path):
+        if not self.window_exists("save_dialog"):
+            raise OneLinerConnectionError("No window named 'save_dialog'")
+        self.save_time = None
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.tty_text)
+        self.saved_path = Path(path)
+        self.open_windows.pop("save_dialog")
+
+def show_error(title, message):
+    """ Shows an error window, or only the terminal message when there is no display """
+    import tkinter
+    import tkinter.messagebox
+    try:
+        tkinter.messagebox.showerror(title, message)
+    except tkinter.TclError:
+        pass
+
+def access_ASPEN(backend=None, metrics=None):
+    """ Connects to open ASPEN Oneliner window to obtain TTY Window data """
+    if backend is None:
+        backend = PywinautoBackend()
+    metrics = metrics or StageMetrics()
+    timeout_seconds = 360
+
+    try:
+        # Connect to ASPEN Oneliner
+        with metrics.stage("automation_connect", backend=type(backend).__name__):
+            backend.connect()
+
+        # Safely close windows before accessing
+        for window in ("distance", "overcurrent", "relay_curve_select", "tty"):
+            if backend.window_exists(window):
+                backend.close_window(window)
+
+        # Show Relay Curve and Logic Scheme
+        backend.menu_select("main", "Relay->View Relay Curve and Logic Scheme...")
+
+        # Wait for the user to select a relay and click OK
+        print("Waiting for user input...")
+        with metrics.stage("automation_wait", step="relay_curve") as record:
+            try:
+                curve_window = backend.wait_for_window(["distance", "overcurrent"], timeout_seconds)
+            except TimeoutError:
+                print("Timeout: No relay curve window opened within 360 seconds.")
+                show_error("Timeout", "Relay Curve window did not open. Program terminated.")
+                sys.exit(1)
+            except Exception as e:
+                print(f"ERROR: {e}")
+                show_error("ERROR", "An error occurred. Program terminated.")
+                sys.exit(1)
+            record["window"] = curve_window
+        print("Relay curve window detected.")
+
+        # Use curve window
+        # Show Relay Operations for All Faults
+        distance_curve = curve_window == "distance"
+        backend.focus_window(curve_window)
+        backend.menu_select(curve_window, "Show->Relay Operations for All Faults")
+
+        print("Relay curve window ready.")
+        print("Showing relay operations for all faults.")
+
+        # Open TTY window
+        backend.menu_select("main", "View->TTY Window")
+        # Select all text in TTY Window
+        backend.menu_select("tty", "Edit->Select All")
+        # Save all text to txt file
+        backend.menu_select("tty", "TTY->Save Selected Text...")
+
+        # Wait for File Explorer to open
+        with metrics.stage("automation_wait", step="save_dialog"):
+            try:
+                backend.wait_for_window(["save_dialog"], timeout_seconds)
+            except Exception:
+                print("Timeout: File Save dialog never appeared.")
+                show_error("Timeout", " File Save dialog never appeared. Program terminated.")
+                sys.exit(1)
+
+        # Wait for user to save file
+        # Extract file folder
+        print("Waiting for user input...")
+        with metrics.stage("automation_wait", step="user_save"):
+            folder_path = backend.watch_save_dialog(timeout_seconds)
+        print(f"Detected folder path: {folder_path}")
+
+        # Wait for dialog to close
+        with metrics.stage("automation_wait", step="dialog_close"):
+            try:
+                backend.wait_for_window_closed("save_dialog", timeout_seconds)
+            except Exception:
+                print("Timeout: File dialog did not close.")
+                show_error("Timeout", "File dialog did not close. Program terminated.")
+                sys.exit(1)
+
+        # Return TTY Window directory & the type of curve
+        if folder_path != "":
+            backend.close_window("tty")
+            if backend.window_exists(curve_window):
+                backend.close_window(curve_window)
+            return Path(folder_path), distance_curve
+        print("File not saved/selected.")
+        show_error("File Not Found", "Could not find saved file. Program has terminated.")
+        sys.exit(0)
+    except OneLinerConnectionError as e:
+        print(f"Error connecting to ASPEN OneLiner: {e}")
+        show_error("ERROR", "Could not connect to ASPEN.\nTry closing & reopening ASPEN OneLiner.\nProgram has terminated.")
+        sys.exit(1)
+    except OneLinerMenuError as e:
+        print(f"Error: No fault detected &/or no relay selected: {e}")
+        show_error("ERROR", "No fault detected.\nPlease run fault(s) manually & select a relay before starting program.\nProgram has terminated.")
+        sys.exit(1)
+
+def wait_for_saved_file(path, timeout, debounce=WATCH_DEBOUNCE_SECONDS):
+    """ Waits for a file to be saved: it exists, is not empty & its size & modification time stay the same for debounce seconds """
+    # Signature & time it was last seen changing
+    last_change = [None, time.monotonic()]
+
+    def is_saved():
+        signature = get_file_signature(path)
+        now = time.monotonic()
+        if signature != last_change[0]:
+            last_change[:] = [signature, now]
+            return False
+        return signature is not None and signature[0] > 0 and now - last_change[1] >= debounce
+    wait_until(is_saved, timeout)
+
+def capture_relay(backend, relay, tty_path, timeout_seconds=120):
+    """ Drives the relay curve window of one relay in a connected ASPEN OneLiner & saves its relay operations for all faults to tty_path.
+    Returns whether the relay has a Distance Curve. """
+    # Safely close windows left from the previous relay
+    for window in ("distance", "overcurrent", "relay_curve_select", "tty"):
+        if backend.window_exists(window):
+            backend.close_window(window)
+    # Show Relay Curve and Logic Scheme for the relay
+    backend.menu_select("main", "Relay->View Relay Curve and Logic Scheme...")
+    backend.wait_for_window(["relay_curve_select"], timeout_seconds)
+    backend.select_relay(relay)
+    curve_window = backend.wait_for_window(["distance", "overcurrent"], timeout_seconds)
+    # Show Relay Operations for All Faults
+    backend.focus_window(curve_window)
+    backend.menu_select(curve_window, "Show->Relay Operations for All Faults")
+    # Save all TTY window text, without asking the user where
+    backend.menu_select("main", "View->TTY Window")
+    backend.menu_select("tty", "Edit->Select All")
+    if os.path.exists(tty_path):
+        # No overwrite prompt in the save dialog
+        os.remove(tty_path)
+    backend.menu_select("tty", "TTY->Save Selected Text...")
+    backend.wait_for_window(["save_dialog"], timeout_seconds)
+    backend.save_tty_text(tty_path)
+    backend.wait_for_window_closed("save_dialog", timeout_seconds)
+    # OneLiner may still be writing the file once the dialog closes
+    wait_for_saved_file(tty_path, timeout_seconds)
+    backend.close_window("tty")
+    if backend.window_exists(curve_window):
+        backend.close_window(curve_window)
+    return curve_window == "distance"
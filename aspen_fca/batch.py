@@ -0,0 +1,150 @@
+"""
+Processes saved TTY text files without ASPEN OneLiner, in worker processes.
+"""
+import contextlib
+import glob
+import io
+import os
+from collections import Counter
+from itertools import repeat
+from pathlib import Path
+
+from .export import get_output_suffix, write_faults
+from .metrics import StageMetrics
+from .parsing import TTY_COMPRESSION_SUFFIXES, clean_tty_text, concat_faults, detect_curve_type, get_tty_folder, get_tty_name, is_tty_file_name, list_archive_members, parse_fault_descriptions, parse_fault_table, read_fault_section, split_archive_path, split_fault_section
+from .store import store_faults
+
+def find_tty_files(paths):
+    """ Expands TTY text files, folders & glob patterns into a list of TTY text files. Zip archives are expanded into the TTY text files in them. """
+    tty_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(entry.path for entry in os.scandir(path) if entry.is_file() and is_tty_file_name(entry.name))
+        elif os.path.isfile(path) or split_archive_path(path)[0]:
+            matches = [path]
+        else:
+            matches = sorted(glob.glob(path, recursive=True))
+        for match in matches:
+            archive_path, member = split_archive_path(match)
+            for tty_file in list_archive_members(archive_path) if archive_path and member is None else [Path(match)]:
+                if tty_file not in tty_files:
+                    tty_files.append(tty_file)
+    return tty_files
+
+def get_summary_path(tty_path, output_dir=None, output_format="xlsx", compression=None):
+    """ Gets the summary file of a TTY text file, in output_dir or next to it (or its zip archive) """
+    return Path(output_dir or get_tty_folder(tty_path)) / f"{get_tty_name(tty_path)} - Fault Summary{get_output_suffix(output_format, compression)}"
+
+def get_summary_paths(tty_files, output_dir=None, output_format="xlsx", compression=None):
+    """ Gets the summary file of each TTY text file. TTY files that would share a summary file, e.g. "Study.txt" & "Study.txt.gz"
+    or "TTY Window.txt" in several folders with one output_dir, are also named after their compression, then their folder.
+    Raises ValueError if summary files are still shared. """
+    suffix = get_output_suffix(output_format, compression)
+    names = [get_tty_name(tty_path) for tty_path in tty_files]
+
+    def get_shared():
+        # Windows file names ignore case
+        summary_files = {}
+        for index, tty_path in enumerate(tty_files):
+            summary_files.setdefault(str(Path(output_dir or get_tty_folder(tty_path)) / names[index]).lower(), []).append(index)
+        return [indexes for indexes in summary_files.values() if len(indexes) > 1]
+
+    for index in [index for indexes in get_shared() for index in indexes]:
+        tty_suffix = Path(tty_files[index]).suffix.lower()
+        if tty_suffix in TTY_COMPRESSION_SUFFIXES:
+            names[index] += f" ({tty_suffix[1:]})"
+    for index in [index for indexes in get_shared() for index in indexes]:
+        names[index] = f"{get_tty_folder(tty_files[index]).resolve().name} - {names[index]}"
+    shared = get_shared()
+    if shared:
+        raise ValueError(f"ERROR: TTY text files would share a summary file: {', '.join(str(tty_files[index]) for index in shared[0])}. Use --combined or separate output folders.")
+    return [Path(output_dir or get_tty_folder(tty_path)) / f"{name} - Fault Summary{suffix}" for tty_path, name in zip(tty_files, names)]
+
+def process_tty_file(tty_path, output_path=None, cache_dir=None, relay_column=False, output_format=None, compression=None, store_path=None, relay=None):
+    """ Parses one saved TTY text file in a batch worker. Returns the fault data, or the error if it could not be processed, & the stage metrics.
+    With a store_path, the fault data is also added to the study store. """
+    metrics = StageMetrics(tty_file=str(tty_path))
+    try:
+        # Keep worker progress messages out of the batch report
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Each worker already has a TTY file of its own, so the fault table is parsed in this process
+            faults = clean_tty_text(tty_path, ["Fault description:"], None, cache_dir=cache_dir, metrics=metrics, relay_column=relay_column, table_workers=1)
+            if store_path:
+                store_faults(store_path, faults, tty_path, relay, metrics)
+            if output_path:
+                write_faults(output_path, faults, output_format, compression, metrics)
+                return len(faults), None, "", metrics.records
+        return len(faults), faults, "", metrics.records
+    except Exception as e:
+        return 0, None, f"{type(e).__name__}: {e}", metrics.records
+
+def check_tty_file(tty_path):
+    """ Parses one saved TTY text file without building fault data or loading pandas. Returns the fault count, or the error. """
+    try:
+        description_lines, table_lines = split_fault_section(read_fault_section(tty_path, ["Fault description:"]))
+        descriptions = parse_fault_descriptions(description_lines)
+        fault_table = parse_fault_table(table_lines, detect_curve_type(table_lines))
+        # Faults matched between both sections
+        description_counts = Counter(descriptions["Fault #"])
+        return sum(description_counts[fault_num] for fault_num in fault_table["Fault #"]), ""
+    except Exception as e:
+        return 0, f"{type(e).__name__}: {e}"
+
+def run_batch(paths, output_dir=None, combined_path=None, workers=None, cache_dir=None, parse_only=False, metrics=None, output_format="xlsx", compression=None, store_path=None):
+    """ Processes saved TTY text files in parallel without ASPEN OneLiner or any dialogs """
+    from concurrent.futures import ProcessPoolExecutor
+    metrics = metrics or StageMetrics()
+    tty_files = find_tty_files(paths)
+    if not tty_files:
+        print("ERROR: No TTY text files found.")
+        return 1
+
+    # Only check that each TTY file parses
+    if parse_only:
+        print(f"Parsing {len(tty_files)} TTY text files...")
+        failures = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for tty_path, (fault_count, error) in zip(tty_files, pool.map(check_tty_file, tty_files)):
+                if error:
+                    failures += 1
+                    print(f"ERROR: {tty_path}: {error}")
+                else:
+                    print(f"{tty_path}: {fault_count} faults")
+        print(f"{len(tty_files) - failures} of {len(tty_files)} TTY text files parsed.")
+        return 1 if failures else 0
+
+    # One spreadsheet per TTY file unless a combined spreadsheet is requested
+    if combined_path:
+        import numpy as np
+        import pandas as pd
+        output_paths = [None] * len(tty_files)
+    else:
+        try:
+            output_paths = get_summary_paths(tty_files, output_dir, output_format, compression)
+        except ValueError as e:
+            print(e)
+            return 1
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Processing {len(tty_files)} TTY text files...")
+    frames = []
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(process_tty_file, tty_files, output_paths, repeat(cache_dir), repeat(False), repeat(output_format), repeat(compression), repeat(store_path))
+        for tty_path, output_path, (fault_count, faults, error, records) in zip(tty_files, output_paths, results):
+            for record in records:
+                metrics.emit(record)
+            if error:
+                failures += 1
+                print(f"ERROR: {tty_path}: {error}")
+                continue
+            if faults is not None:
+                faults.insert(0, "TTY File", pd.Categorical.from_codes(np.zeros(len(faults), dtype="int8"), [tty_path.name]))
+                frames.append(faults)
+            print(f"{tty_path}: {fault_count} faults" + (f" -> {output_path}" if output_path else ""))
+
+    if combined_path and frames:
+        print("Summary saved at:", write_faults(combined_path, concat_faults(frames), output_format, compression, metrics))
+    print(f"{len(tty_files) - failures} of {len(tty_files)} TTY text files processed.")
+    return 1 if failures else 0
@@ -0,0 +1,81 @@
+"""
+Local cache of parsed fault data, keyed by a hash of the fault section text & parse options.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+# Changes whenever parsing changes the fault data returned, so older cache entries are not reused
+PARSER_VERSION = "6"
+# Cached fault data is evicted, least recently used first, past this size
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+def get_default_cache_dir():
+    """ Gets the local folder for cached fault data """
+    base_dir = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base_dir) / "ASPEN FCA" / "cache"
+
+def get_cache_key(fault_section, curve_type, relay_column=False):
+    """ Hashes the fault section text together with the parser version, curve type & parse options """
+    digest = hashlib.sha256(f"{PARSER_VERSION}|{curve_type}|{'relay|' if relay_column else ''}".encode('utf-8'))
+    digest.update(fault_section.encode('utf-8'))
+    return digest.hexdigest()
+
+def load_cached_faults(cache_dir, cache_key):
+    """ Loads previously parsed fault data from the cache. Returns None if it is not cached. """
+    import pandas as pd
+    for suffix, reader in ((".parquet", pd.read_parquet), (".pkl", pd.read_pickle)):
+        cache_path = Path(cache_dir) / f"{cache_key}{suffix}"
+        if not cache_path.exists():
+            continue
+        try:
+            faults_frame = reader(cache_path)
+            # Mark as recently used
+            os.utime(cache_path)
+            return faults_frame
+        except Exception as e:
+            print(f"Cached fault data could not be read: {e}")
+    return None
+
+def store_cached_faults(cache_dir, cache_key, faults_frame, max_bytes=CACHE_MAX_BYTES):
+    """ Saves parsed fault data to the cache as Parquet, or as a pickle if no Parquet engine is installed """
+    cache_dir = Path(cache_dir)
+    # Write to a temporary file first so other processes never read a partial file
+    temp_path = cache_dir / f"{cache_key}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            faults_frame.to_parquet(temp_path, index=False)
+            cache_path = cache_dir / f"{cache_key}.parquet"
+        except ImportError:
+            faults_frame.to_pickle(temp_path)
+            cache_path = cache_dir / f"{cache_key}.pkl"
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        print(f"Fault data could not be cached: {e}")
+        return
+    finally:
+        if temp_path.exists():
+            os.remove(temp_path)
+    evict_cached_faults(cache_dir, max_bytes)
+
+def evict_cached_faults(cache_dir, max_bytes=CACHE_MAX_BYTES):
+    """ Deletes the least recently used cached fault data until the cache fits in max_bytes """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith((".parquet", ".pkl")):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Already evicted by another process
+            pass
+        total_bytes -= size
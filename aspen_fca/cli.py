@@ -0,0 +1,398 @@
+"""
+Command line of ASPEN FCA. Without a command, runs against the open ASPEN OneLiner window.
+"""
+import argparse
+import contextlib
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .analysis import COMPARE_THRESHOLDS, COORDINATION_CTI, COORDINATION_ZONE_TIMERS, compare_faults, coordinate_faults, get_coordination_cells
+from .automation import FakeOneLinerBackend, OneLinerConnectionError, access_ASPEN, ask_file_name, get_txt_file, show_error
+from .batch import run_batch
+from .cache import get_default_cache_dir
+from .excel import write_xlsx_sheets
+from .export import FORMAT_PACKAGES, OUTPUT_SUFFIXES, REQUIRED_PACKAGES, create_xlsx, find_missing_packages, get_output_format, get_output_suffix, get_saved_format, load_fault_study, write_faults
+from .metrics import StageMetrics, get_stage_metrics
+from .parsing import clean_tty_text, get_tty_folder, get_tty_name
+from .store import STORE_FILTERS, STORE_MEASURES, STORE_STATS, query_store, store_faults
+from .sweep import read_relay_list, sweep_ASPEN
+from .watch import WATCH_DEBOUNCE_SECONDS, WATCH_POLL_SECONDS, WATCH_WORKERS, watch_folders
+from .zones import ZONE_GRID_BINS, check_impedance_zones, read_zone_settings
+
+def run_query(store_path, stat=None, measure="Operate Time (s)", since=None, before=None, output_path=None, **filters):
+    """ Prints the result of a study store query, or writes the matching faults to output_path """
+    if not os.path.exists(store_path):
+        print(f"ERROR: Study store '{store_path}' not found.")
+        return 1
+    if stat is None:
+        # Imported first, so the time printed is the query's own
+        importlib.import_module("pandas")
+    start_time = time.perf_counter()
+    try:
+        result = query_store(store_path, stat, measure, since, before, **filters)
+    except ValueError as e:
+        print(e)
+        return 1
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    if stat is not None:
+        print(f"{stat} {'faults' if stat == 'count' else measure}: {result}")
+    elif output_path:
+        print("Faults saved at:", write_faults(output_path, result))
+    else:
+        print(result.to_string(index=False, max_rows=50))
+    if stat is None:
+        print(f"{len(result)} faults in {result['Study'].nunique()} studies.")
+    print(f"Query took {elapsed_ms:.1f} ms.")
+    return 0
+
+def run_sweep(relays, relays_file=None, output_path=None, tty_dir=None, recording_path=None, workers=None, cache_dir=None, metrics=None, store_path=None,
+              pairs=(), cti=COORDINATION_CTI, zone_timers=None):
+    """ Runs a relay sweep against ASPEN OneLiner, or a recorded session """
+    relays = list(relays) + (read_relay_list(relays_file) if relays_file else [])
+    # Relays of a pair are captured even when not listed
+    for relay in (relay for pair in pairs for relay in pair):
+        if relay not in relays:
+            relays.append(relay)
+    if not relays:
+        print("ERROR: No relays to sweep.")
+        return 1
+    backend = FakeOneLinerBackend.from_recording(recording_path, user_actions=False) if recording_path else None
+    output_path = Path(output_path or "Relay Sweep - Fault Summary.xlsx")
+    try:
+        failed_relays = sweep_ASPEN(relays, output_path, tty_dir, backend, workers, cache_dir, metrics, store_path, pairs, cti, zone_timers)
+    except OneLinerConnectionError as e:
+        print(f"Error connecting to ASPEN OneLiner: {e}")
+        return 1
+    return 1 if failed_relays else 0
+
+def run_replay(recording_path, output_path=None, cache_dir=None, metrics=None, output_format="xlsx", compression=None, store_path=None):
+    """ Runs the capture-to-workbook pipeline against a recorded ASPEN OneLiner session """
+    metrics = metrics or StageMetrics()
+    with metrics.stage("replay", recording=str(recording_path)) as record:
+        backend = FakeOneLinerBackend.from_recording(recording_path)
+        tty_folder_path, curve_type = access_ASPEN(backend, metrics)
+        print(f"Text file location: {backend.saved_path}")
+        faults = clean_tty_text(backend.saved_path, ["Fault description:"], curve_type, cache_dir=cache_dir, metrics=metrics)
+        if store_path:
+            store_faults(store_path, faults, backend.saved_path, metrics=metrics)
+        if output_path is None:
+            output_path = tty_folder_path / f"{backend.saved_path.stem} - Fault Summary{get_output_suffix(output_format, compression)}"
+        print("Summary saved at:", write_faults(output_path, faults, output_format, compression, metrics))
+        record["rows"] = len(faults)
+    print(f"Pipeline finished in {record['seconds']:.3f} seconds.")
+    return 0
+
+def run_compare(before_path, after_path, output_path=None, thresholds=None, cache_dir=None, metrics=None):
+    """ Compares two fault studies, e.g. before & after a settings change, into an Excel report of the faults that changed """
+    metrics = metrics or StageMetrics()
+    before = load_fault_study(before_path, cache_dir, metrics)
+    after = load_fault_study(after_path, cache_dir, metrics)
+    with metrics.stage("compare", before_rows=len(before), after_rows=len(after)) as record:
+        report, counts = compare_faults(before, after, thresholds)
+        record.update(rows=len(report), **{label.lower().replace(" ", "_"): count for label, count in counts.items()})
+    for label, count in counts.items():
+        print(f"{label}: {count}")
+    if output_path is None:
+        output_path = get_tty_folder(after_path) / f"{get_tty_name(after_path)} - Fault Changes.xlsx"
+    summary_cells = {"Fault Changes": [(f"{label} Faults" if label in ("Added", "Removed") else f"{label} Changes", count) for label, count in counts.items()]}
+    print("Spreadsheet saved at:", write_xlsx_sheets(output_path, {"Fault Changes": report}, metrics, summary_cells))
+    return 0
+
+def run_coordinate(primary_path, backup_path, output_path=None, cti=COORDINATION_CTI, zone_timers=None, cache_dir=None, metrics=None):
+    """ Checks the coordination of a primary relay & its backup over the same faults into a Coordination sheet """
+    metrics = metrics or StageMetrics()
+    primary = load_fault_study(primary_path, cache_dir, metrics)
+    backup = load_fault_study(backup_path, cache_dir, metrics)
+    with metrics.stage("coordinate", primary_rows=len(primary), backup_rows=len(backup)) as record:
+        try:
+            report, counts = coordinate_faults(primary, backup, cti, zone_timers)
+        except ValueError as e:
+            print(e)
+            return 1
+        record.update(rows=len(report), **{label.lower().replace(" ", "_"): count for label, count in counts.items()})
+    for label, count in counts.items():
+        print(f"{label}: {count}")
+    if output_path is None:
+        output_path = get_tty_folder(primary_path) / f"{get_tty_name(primary_path)} - Coordination.xlsx"
+    summary_cells = {"Coordination": get_coordination_cells(counts)}
+    print("Spreadsheet saved at:", write_xlsx_sheets(output_path, {"Coordination": report}, metrics, summary_cells))
+    return 0
+
+def run_zone_check(study_path, zones_path, output_path=None, bins=ZONE_GRID_BINS, cache_dir=None, metrics=None):
+    """ Checks the impedance of every fault of a fault study against zone characteristics into Zone Check & Impedance Density sheets """
+    metrics = metrics or StageMetrics()
+    try:
+        zones = read_zone_settings(zones_path)
+    except OSError as e:
+        print(f"ERROR: {e}")
+        return 1
+    except ValueError as e:
+        print(e)
+        return 1
+    faults = load_fault_study(study_path, cache_dir, metrics)
+    with metrics.stage("zone_check", rows=len(faults), zones=len(zones)) as record:
+        try:
+            report, density, counts = check_impedance_zones(faults, zones, bins)
+        except ValueError as e:
+            print(e)
+            return 1
+        record.update({label.lower().replace(" ", "_"): count for label, count in counts.items()})
+    for label, count in counts.items():
+        print(f"{label}: {count}")
+    if output_path is None:
+        output_path = get_tty_folder(study_path) / f"{get_tty_name(study_path)} - Zone Check.xlsx"
+    summary_cells = {"Zone Check": [(f"{label} Faults", count) for label, count in counts.items()]}
+    print("Spreadsheet saved at:", write_xlsx_sheets(output_path, {"Zone Check": report, "Impedance Density": density}, metrics, summary_cells))
+    return 0
+
+def save_summary(tty_path, faults, metrics=None, output_format="xlsx", compression=None):
+    """ Asks for the summary file name & writes the fault data next to the TTY text file, asking again while the file is open elsewhere """
+    file_name = ask_file_name("Enter a name for the Excel summary file:")
+    while True:
+        try:
+            return create_xlsx(tty_path, faults, metrics, output_format, compression, file_name)
+        except PermissionError as e:
+            print("Permission Error:", e)
+            import tkinter.messagebox
+            tkinter.messagebox.showinfo("ERROR", "Please close any already open Summary spreadsheets before program can continue.")
+
+# Module import time allowed for the command line, on top of the interpreter's own startup
+STARTUP_BUDGET_MS = 150
+# Packages that must only be imported once a run needs them
+LAZY_PACKAGES = ("numpy", "pandas", "openpyxl", "pyarrow", "pywinauto", "tkinter")
+
+def measure_startup():
+    """ Imports the command line in a fresh interpreter with -X importtime. Returns the import time in ms & a list of (ms, package) for each import.
+    Only top-level imports count towards the time, as nested ones are included in them. """
+    marker = "ASPEN FCA startup"
+    package_root = str(Path(__file__).resolve().parent.parent)
+    code = f"import sys; sys.path.insert(0, {package_root!r}); sys.stderr.write('{marker}\\n'); sys.stderr.flush(); import aspen_fca.cli"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    imports = []
+    total_ms = 0.0
+    started = False
+    # Lines read "import time: self [us] | cumulative | package", nested imports are indented
+    for line in result.stderr.splitlines():
+        if line == marker:
+            started = True
+        elif started and line.startswith("import time:"):
+            _, cumulative, package = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative) / 1000, package.strip()))
+                if not package[1:].startswith(" "):
+                    total_ms += int(cumulative) / 1000
+    return total_ms, imports
+
+def run_startup_check(budget_ms=STARTUP_BUDGET_MS):
+    """ Checks the import time of the command line against the startup budget & that heavy packages stay lazy """
+    total_ms, imports = measure_startup()
+    for ms, package in sorted(imports, reverse=True)[:5]:
+        print(f"{ms:8.1f} ms  {package}")
+    print(f"Startup imports: {total_ms:.1f} ms (budget {budget_ms} ms)")
+    eager_packages = sorted({package.split(".")[0] for _, package in imports} & set(LAZY_PACKAGES))
+    if eager_packages:
+        print(f"ERROR: Imported at startup: {', '.join(eager_packages)}")
+    if total_ms > budget_ms:
+        print("ERROR: Startup budget exceeded.")
+    return 1 if eager_packages or total_ms > budget_ms else 0
+
+def get_export_format(args):
+    """ Gets the export format of a run from --format, or else the extension of the output file given """
+    if args.command in ("sweep", "compare", "coordinate", "zone-check"):
+        # One sheet per relay / a styled report
+        return "xlsx"
+    if getattr(args, "format", None):
+        return args.format
+    output_path = getattr(args, "combined", None) or getattr(args, "output", None)
+    return get_output_format(output_path) if output_path else "xlsx"
+
+# Arguments of the commands that read fault studies, which may be saved summary files
+STUDY_ARGUMENTS = {"compare": ("before", "after"), "coordinate": ("primary", "backup"), "zone-check": ("study",)}
+
+def get_required_packages(args, export_format):
+    """ Gets the external packages a run needs """
+    if args.command == "startup-check" or (args.command == "batch" and args.parse_only) or (args.command == "query" and args.stat):
+        return ()
+    if args.command == "query" and not args.output:
+        # Printed faults
+        return REQUIRED_PACKAGES
+    if args.command == "serve":
+        # Fault data sent as Arrow IPC
+        return REQUIRED_PACKAGES + ("pyarrow",)
+    packages = REQUIRED_PACKAGES + FORMAT_PACKAGES[export_format]
+    if args.command is None or (args.command == "sweep" and not args.replay):
+        # Live ASPEN OneLiner session
+        packages += ("pywinauto",)
+    if args.command in STUDY_ARGUMENTS:
+        # Saved summary files being read
+        for path in (getattr(args, name) for name in STUDY_ARGUMENTS[args.command]):
+            if get_saved_format(path):
+                packages += FORMAT_PACKAGES[get_saved_format(path)]
+    return packages
+
+def parse_zone_timer(text):
+    """ Reads a zone timer option, e.g. Z2=0.3 """
+    zone, _, seconds = text.partition("=")
+    try:
+        return zone.strip(), float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ZONE=SECONDS, e.g. Z2=0.3, not '{text}'") from None
+
+def add_coordination_arguments(command_parser):
+    """ Adds the coordination criteria options """
+    command_parser.add_argument("--cti", type=float, default=COORDINATION_CTI, help="Smallest coordination time interval in seconds (default: %(default)s)")
+    zone_timers = " ".join(f"{zone}={seconds}" for zone, seconds in COORDINATION_ZONE_TIMERS.items())
+    command_parser.add_argument("--zone-timer", type=parse_zone_timer, action="append", metavar="ZONE=SECONDS",
+                                help=f"Smallest operate time of a distance zone, repeat for each zone (default: {zone_timers})")
+
+def parse_arguments(argv):
+    """ Reads command line options. Without a command, the program runs against the open ASPEN OneLiner window. """
+    parser = argparse.ArgumentParser(description="Summarizes ASPEN OneLiner relay operations for all faults in Excel.")
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser("batch", help="Process saved TTY text files without ASPEN OneLiner.")
+    batch_parser.add_argument("paths", nargs="+", help="TTY text files (also .gz, .xz, .zst & zip archives), folders or glob patterns")
+    batch_parser.add_argument("--output-dir", help="Folder for the summary files (default: next to each TTY file)")
+    batch_parser.add_argument("--combined", metavar="FILE", help="Write all TTY files to one summary file instead")
+    batch_parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    batch_parser.add_argument("--parse-only", action="store_true", help="Only check that each TTY file parses & report its fault count (no spreadsheets, pandas or openpyxl)")
+    replay_parser = subparsers.add_parser("replay", help="Run the whole pipeline against a recorded ASPEN OneLiner session (no Windows needed).")
+    replay_parser.add_argument("recording", help="Recorded session (JSON)")
+    replay_parser.add_argument("--output", help="Summary file (default: next to the saved TTY text file)")
+    sweep_parser = subparsers.add_parser("sweep", help="Capture relay operations for all faults of several relays into one workbook.")
+    sweep_parser.add_argument("relays", nargs="*", help="Relay names as listed in the relay curve window")
+    sweep_parser.add_argument("--relays-file", help="Text file with one relay name per line")
+    sweep_parser.add_argument("--output", help="Excel summary file (default: Relay Sweep - Fault Summary.xlsx)")
+    sweep_parser.add_argument("--tty-dir", help="Folder for the TTY text saved for each relay (default: next to the Excel summary file)")
+    sweep_parser.add_argument("--workers", type=int, help="Number of parsing processes (default: number of CPUs)")
+    sweep_parser.add_argument("--replay", metavar="RECORDING", help="Sweep a recorded ASPEN OneLiner session instead (JSON)")
+    compare_parser = subparsers.add_parser("compare", help="Compare two fault studies, e.g. before & after a settings change.")
+    compare_parser.add_argument("before", help="TTY text file or saved summary file of the first fault study")
+    compare_parser.add_argument("after", help="TTY text file or saved summary file of the second fault study")
+    compare_parser.add_argument("--output", help="Excel report file (default: next to the second fault study)")
+    compare_parser.add_argument("--time-threshold", type=float, default=COMPARE_THRESHOLDS["Operate Time (s)"], help="Smallest operate time change reported in seconds (default: %(default)s)")
+    compare_parser.add_argument("--impedance-threshold", type=float, default=COMPARE_THRESHOLDS["Impedance (Magnitude - Ohms secondary)"], help="Smallest impedance change reported in ohms secondary (default: %(default)s)")
+    compare_parser.add_argument("--current-threshold", type=float, default=COMPARE_THRESHOLDS["Fault Current (3I0 - A)"], help="Smallest 3I0 fault current change reported in A (default: %(default)s)")
+    sweep_parser.add_argument("--pair", nargs=2, action="append", default=[], metavar=("PRIMARY", "BACKUP"), help="Check the coordination of a primary relay & its backup, repeat for each pair")
+    add_coordination_arguments(sweep_parser)
+    coordinate_parser = subparsers.add_parser("coordinate", help="Check the coordination of a primary relay & its backup over the same faults.")
+    coordinate_parser.add_argument("primary", help="TTY text file or saved summary file of the primary relay")
+    coordinate_parser.add_argument("backup", help="TTY text file or saved summary file of the backup relay")
+    coordinate_parser.add_argument("--output", help="Excel file for the Coordination sheet, added to it if it exists (default: next to the primary relay's file)")
+    add_coordination_arguments(coordinate_parser)
+    zone_parser = subparsers.add_parser("zone-check", help="Check the impedance of every fault against distance zone characteristics.")
+    zone_parser.add_argument("study", help="TTY text file or saved summary file of a Distance Curve fault study")
+    zone_parser.add_argument("--zones", required=True, help="Zone characteristics (JSON), e.g. {\"angle\": 75, \"zones\": {\"Z1\": {\"shape\": \"mho\", \"reach\": 8}}}")
+    zone_parser.add_argument("--output", help="Excel file for the Zone Check & Impedance Density sheets, added to it if it exists (default: next to the fault study)")
+    zone_parser.add_argument("--bins", type=int, default=ZONE_GRID_BINS, help="Rows & columns of the impedance density grid (default: %(default)s)")
+    watch_parser = subparsers.add_parser("watch", help="Parse TTY text files as soon as they are saved in folders, until stopped.")
+    watch_parser.add_argument("folders", nargs="+", help="Folders to watch for TTY text files")
+    watch_parser.add_argument("--output-dir", help="Folder for the summary files (default: next to each TTY file)")
+    watch_parser.add_argument("--workers", type=int, default=WATCH_WORKERS, help="Number of worker processes kept running (default: %(default)s)")
+    watch_parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS, help="Seconds a TTY file must stay unchanged before it is parsed (default: %(default)s)")
+    watch_parser.add_argument("--poll", action="store_true", help="Scan the folders instead of using inotify, e.g. for network drives")
+    watch_parser.add_argument("--poll-interval", type=float, default=WATCH_POLL_SECONDS, help="Seconds between folder scans (default: %(default)s)")
+    watch_parser.add_argument("--existing", action="store_true", help="Also parse the TTY text files already in the folders")
+    query_parser = subparsers.add_parser("query", help="Query the fault data of every fault study in a study store.")
+    query_parser.add_argument("store", help="Study store (SQLite) written with --store")
+    query_parser.add_argument("--line", dest="faulted_line", help="Faulted line, * matches any text")
+    query_parser.add_argument("--fault-type", help="Fault type, e.g. 1LG")
+    query_parser.add_argument("--outage", dest="branch_outage", help="Branch outage, \"\" for none")
+    query_parser.add_argument("--zone", dest="operate_zone", help="Operate zone, e.g. Z1")
+    query_parser.add_argument("--fault-sim", help="Fault simulation, e.g. Close-In Fault")
+    query_parser.add_argument("--relay", help="Relay name")
+    query_parser.add_argument("--source", help="TTY text file the study was parsed from")
+    query_parser.add_argument("--since", help="Studies stored on or after this date, e.g. 2026-01-01")
+    query_parser.add_argument("--before", help="Studies stored before this date")
+    query_parser.add_argument("--stat", choices=STORE_STATS, help="Print this statistic instead of the faults")
+    query_parser.add_argument("--measure", choices=STORE_MEASURES, default="time", help="Measure of the statistic (default: time)")
+    query_parser.add_argument("--output", help="Save the matching faults to this file instead of printing them")
+    serve_parser = subparsers.add_parser("serve", help="Keep the parser loaded & answer parse requests over localhost HTTP, until stopped.")
+    # The service module (& http.server) is only imported to serve, so its defaults apply when these are not given
+    serve_parser.add_argument("--host", default=argparse.SUPPRESS, help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=argparse.SUPPRESS, help="Port to listen on, 0 for any free port (default: 8765)")
+    serve_parser.add_argument("--memory-studies", type=int, default=argparse.SUPPRESS, help="Parsed fault studies kept in memory (default: 16)")
+    startup_parser = subparsers.add_parser("startup-check", help="Measure the import time of this script against the startup budget.")
+    startup_parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help=f"Import time allowed in ms (default: {STARTUP_BUDGET_MS})")
+    # Options repeated after a command only override the ones before it when given
+    main_defaults = {"cache_dir": get_default_cache_dir(), "no_cache": False, "metrics": None, "metrics_hook": None}
+    for command_parser in (parser, batch_parser, replay_parser, sweep_parser, compare_parser, coordinate_parser, zone_parser, watch_parser, serve_parser):
+        defaults = main_defaults if command_parser is parser else dict.fromkeys(main_defaults, argparse.SUPPRESS)
+        command_parser.add_argument("--cache-dir", default=defaults["cache_dir"], help="Folder for cached fault data")
+        command_parser.add_argument("--no-cache", action="store_true", default=defaults["no_cache"], help="Always parse the TTY text again")
+        command_parser.add_argument("--metrics", metavar="JSONL", default=defaults["metrics"], help="Append stage timings & counters as JSON lines (- for the terminal)")
+        command_parser.add_argument("--metrics-hook", metavar="MODULE:FUNCTION", default=defaults["metrics_hook"], help="Function called with each stage metrics record")
+    for command_parser in (parser, batch_parser, replay_parser, sweep_parser, watch_parser):
+        default = None if command_parser is parser else argparse.SUPPRESS
+        command_parser.add_argument("--store", metavar="DB", default=default, help="Also add the fault data to this SQLite study store")
+    for command_parser in (parser, batch_parser, replay_parser, watch_parser):
+        default = None if command_parser is parser else argparse.SUPPRESS
+        command_parser.add_argument("--format", choices=OUTPUT_SUFFIXES, default=default, help="Export format (default: from the output file extension, else xlsx)")
+        command_parser.add_argument("--compression", default=default, help="Parquet: zstd (default), snappy, gzip, brotli, lz4 or none. Feather: zstd (default), lz4 or none. CSV: none (default), gzip, bz2, xz or zstd")
+    args = parser.parse_args(argv)
+    if args.command == "batch" and args.parse_only and args.store:
+        # Only fault counts are parsed, so there is no fault data to store
+        batch_parser.error("--store cannot be used with --parse-only")
+    return args
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    try:
+        export_format = get_export_format(args)
+    except ValueError as e:
+        print(e)
+        return 1
+    # Fail fast instead of installing packages at run time
+    missing_packages = find_missing_packages(get_required_packages(args, export_format))
+    if missing_packages:
+        message = f"Missing Python packages: {', '.join(missing_packages)}.\nInstall them with: pip install {' '.join(missing_packages)}"
+        print(f"ERROR: {message}")
+        if args.command is None:
+            show_error("ERROR", f"{message}\nProgram has terminated.")
+        return 1
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    zone_timers = dict(args.zone_timer) if getattr(args, "zone_timer", None) else None
+    if args.command == "startup-check":
+        return run_startup_check(args.budget_ms)
+    if args.command == "query":
+        filters = {name: getattr(args, name) for name in STORE_FILTERS}
+        return run_query(args.store, args.stat, STORE_MEASURES[args.measure], args.since, args.before, args.output, **filters)
+    with contextlib.closing(get_stage_metrics(args.metrics, args.metrics_hook)) as metrics:
+        if args.command == "batch":
+            return run_batch(args.paths, args.output_dir, args.combined, args.workers, cache_dir, args.parse_only, metrics, export_format, args.compression, args.store)
+        if args.command == "replay":
+            return run_replay(args.recording, args.output, cache_dir, metrics, export_format, args.compression, args.store)
+        if args.command == "sweep":
+            return run_sweep(args.relays, args.relays_file, args.output, args.tty_dir, args.replay, args.workers, cache_dir, metrics, args.store,
+                             args.pair, args.cti, zone_timers)
+        if args.command == "compare":
+            thresholds = {
+                "Operate Time (s)": args.time_threshold,
+                "Impedance (Magnitude - Ohms secondary)": args.impedance_threshold,
+                "Fault Current (3I0 - A)": args.current_threshold
+            }
+            return run_compare(args.before, args.after, args.output, thresholds, cache_dir, metrics)
+        if args.command == "coordinate":
+            return run_coordinate(args.primary, args.backup, args.output, args.cti, zone_timers, cache_dir, metrics)
+        if args.command == "zone-check":
+            return run_zone_check(args.study, args.zones, args.output, args.bins, cache_dir, metrics)
+        if args.command == "serve":
+            from .service import serve
+            options = {name: getattr(args, name) for name in ("host", "port", "memory_studies") if hasattr(args, name)}
+            return serve(cache_dir=cache_dir, metrics=metrics, **options)
+        if args.command == "watch":
+            return watch_folders(args.folders, args.output_dir, args.workers, cache_dir, metrics, export_format, args.compression,
+                                 args.debounce, args.poll, args.poll_interval, args.existing, args.store)
+
+        tty_folder_path, curve_type = access_ASPEN(metrics=metrics)
+        tty_path = get_txt_file(tty_folder_path, "Please select your TTY window output file.")
+        print(f"Text file location: {tty_path}")
+        faults = clean_tty_text(tty_path, ["Fault description:"], curve_type, cache_dir=cache_dir, metrics=metrics)
+        if args.store:
+            store_faults(args.store, faults, tty_path, metrics=metrics)
+        print("Summary saved at:", save_summary(tty_path, faults, metrics, export_format, args.compression))
+        return 0
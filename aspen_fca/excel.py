@@ -0,0 +1,467 @@
+"""
+Styled Excel output, streamed to new spreadsheets or merged into existing ones.
+"""
+import io
+import os
+import tempfile
+import re
+from pathlib import Path
+
+from .analysis import summarize_faults
+from .metrics import StageMetrics
+from .parsing import widen_measurements
+
+# Excel worksheet row limit, including the header row
+EXCEL_MAX_ROWS = 1048576
+# DataFrame rows converted to Python values at a time while writing to Excel
+EXCEL_CHUNK_ROWS = 50000
+# Excel sheet name length limit, less room for the " (n)" of sheets past the row limit
+EXCEL_SHEET_NAME_LENGTH = 31 - 5
+
+def get_named_styles():
+    """ Creates the named cell styles used in the Excel summary file """
+    from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    default_font = Font(name="Calibri", sz=11, family=2, scheme="minor")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    fill_gray = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
+    return [
+        NamedStyle(name="Fault Header", font=header_font, fill=header_fill, border=thin_border),
+        NamedStyle(name="Fault Row", font=default_font, border=thin_border, alignment=Alignment(horizontal="center", vertical="center")),
+        NamedStyle(name="Fault Summary Label", font=header_font, fill=header_fill),
+        NamedStyle(name="Fault Summary Value", font=default_font, fill=fill_gray)
+    ]
+
+def register_named_styles(wb):
+    """ Adds the named cell styles to the workbook once, so cells only reference them """
+    for style in get_named_styles():
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+
+def add_banded_rows(ws, end_col, last_row):
+    """ Shades every other data row with one conditional formatting rule instead of filling each cell """
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import PatternFill
+    from openpyxl.utils import get_column_letter
+    if last_row < 2:
+        return
+    fill_gray = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
+    ws.conditional_formatting.add(f"A2:{get_column_letter(end_col)}{last_row}", FormulaRule(formula=["MOD(ROW(),2)=0"], fill=fill_gray))
+
+def iter_frame_rows(dataframe, start, stop):
+    """ Yields DataFrame rows as Python values, converting one chunk of rows at a time """
+    import pandas as pd
+    for chunk_start in range(start, stop, EXCEL_CHUNK_ROWS):
+        chunk = dataframe.iloc[chunk_start:min(chunk_start + EXCEL_CHUNK_ROWS, stop)]
+        columns = []
+        for column_name in chunk.columns:
+            column = chunk[column_name]
+            if column.dtype == "float32":
+                column = pd.Series(widen_measurements(column), index=column.index)
+            # Missing values are left as empty cells
+            if column.hasnans:
+                column = column.astype(object).where(column.notna(), None)
+            columns.append(column.tolist())
+        yield from zip(*columns)
+
+def styled_cell(ws, value, style):
+    """ Makes a cell that uses one of the named cell styles """
+    from openpyxl.cell import WriteOnlyCell
+    cell = WriteOnlyCell(ws, value)
+    cell.style = style
+    return cell
+
+def style_fault_sheet(ws, end_col, last_row):
+    """ Adds the autofilter & banded rows to a fault data worksheet """
+    from openpyxl.utils import get_column_letter
+    # Add Autofilter sorting dropdown & banded rows effect
+    ws.auto_filter.ref = f"A1:{get_column_letter(end_col)}{last_row}"
+    add_banded_rows(ws, end_col, last_row)
+
+def write_fault_sheet(ws, dataframe, start, stop, summary_cells, write_only):
+    """ Writes a range of DataFrame rows to a worksheet with its header """
+    end_col = len(dataframe.columns)
+
+    # Header row, followed by the label & value of each summary cell 2 columns apart
+    header = [styled_cell(ws, column_name, "Fault Header") for column_name in dataframe.columns]
+    for label, value in summary_cells:
+        header += [None, None, styled_cell(ws, label, "Fault Summary Label"), styled_cell(ws, value, "Fault Summary Value")]
+    ws.append(header)
+
+    if write_only:
+        # Rows are written out as they are appended, so one styled cell per column can be reused
+        row_cells = [styled_cell(ws, None, "Fault Row") for _ in range(end_col)]
+        for row in iter_frame_rows(dataframe, start, stop):
+            for cell, value in zip(row_cells, row):
+                cell.value = value
+            ws.append(row_cells)
+    else:
+        for row in iter_frame_rows(dataframe, start, stop):
+            ws.append([styled_cell(ws, value, "Fault Row") for value in row])
+
+def write_xlsx(file_path, dataframe, sheet_name="Fault Summary", metrics=None, statistics_sheet="Fault Statistics"):
+    """ Writes fault data to a new or existing Excel spreadsheet without any dialogs, followed by its summary statistics sheet """
+    metrics = metrics or StageMetrics()
+    sheets = {sheet_name: dataframe}
+    if statistics_sheet:
+        with metrics.stage("summary", rows=len(dataframe)) as record:
+            sheets[statistics_sheet] = summarize_faults(dataframe)
+            record["groups"] = len(sheets[statistics_sheet])
+    return write_xlsx_sheets(file_path, sheets, metrics)
+
+class WorkbookMergeError(Exception):
+    """ Sheets could not be added to an existing workbook without loading it """
+
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+# Collections of styles.xml in document order: element & the attribute other parts use to point at one
+STYLE_COLLECTIONS = (
+    ("fonts", "font", "fontId"),
+    ("fills", "fill", "fillId"),
+    ("borders", "border", "borderId"),
+    ("cellStyleXfs", "xf", "xfId"),
+    ("cellXfs", "xf", "s"),
+    ("dxfs", "dxf", "dxfId")
+)
+# Sections of styles.xml in the order the schema requires
+STYLE_SECTIONS = ("numFmts", "fonts", "fills", "borders", "cellStyleXfs", "cellXfs", "cellStyles", "dxfs", "tableStyles", "colors", "extLst")
+
+def get_xml_attributes(tag):
+    """ Gets the attributes of an XML tag, with their values still escaped """
+    return dict(re.findall(r'([\w:]+)="([^"]*)"', tag))
+
+def find_xml_section(xml, tag):
+    """ Finds the first <tag ...>...</tag> or <tag .../> element in XML text. Group 1 is its content. """
+    return re.search(rf"<{tag}\b[^>]*?(?:/>|>(.*?)</{tag}>)", xml, re.DOTALL)
+
+def get_xml_children(xml, section_tag, tag):
+    """ Gets the text of each <tag> element inside the first <section_tag> element """
+    section = find_xml_section(xml, section_tag)
+    content = section.group(1) if section else None
+    return re.findall(rf"<{tag}\b(?:[^>]*?/>|[^>]*?>.*?</{tag}>)", content or "", re.DOTALL)
+
+def add_xml_children(xml, section_tag, elements, count):
+    """ Appends elements to the first <section_tag> element & updates its count """
+    section = find_xml_section(xml, section_tag)
+    if section is None:
+        raise WorkbookMergeError(f"No <{section_tag}> in the existing workbook")
+    start_tag = re.match(rf"<{section_tag}\b[^>]*?(?=/?>)", section.group()).group()
+    if 'count="' in start_tag:
+        start_tag = re.sub(r'\bcount="\d+"', f'count="{count}"', start_tag)
+    else:
+        start_tag += f' count="{count}"'
+    merged_section = f"{start_tag}>{section.group(1) or ''}{''.join(elements)}</{section_tag}>"
+    return xml[:section.start()] + merged_section + xml[section.end():]
+
+def add_style_section(styles_xml, section_tag):
+    """ Adds an empty section to styles.xml if it has none, e.g. the <dxfs> of workbooks without conditional formats """
+    if find_xml_section(styles_xml, section_tag):
+        return styles_xml
+    # Goes before the first section that follows it in the schema
+    following = [section.start() for section in (find_xml_section(styles_xml, tag) for tag in STYLE_SECTIONS[STYLE_SECTIONS.index(section_tag) + 1:]) if section]
+    anchor = min(following) if following else styles_xml.rfind("</styleSheet>")
+    if anchor < 0:
+        raise WorkbookMergeError("No <styleSheet> in the existing workbook")
+    return styles_xml[:anchor] + f'<{section_tag} count="0"/>' + styles_xml[anchor:]
+
+def merge_styles(styles_xml, new_styles_xml):
+    """ Adds the styles of a new workbook to the styles of an existing one, reusing identical entries.
+    Returns the merged styles & {index attribute: {index in the new workbook: index in the merged styles}}. """
+    index_maps = {"numFmtId": {}}
+
+    # Custom number formats are matched by format code
+    formats = {attributes["formatCode"]: attributes["numFmtId"] for attributes in map(get_xml_attributes, get_xml_children(styles_xml, "numFmts", "numFmt"))}
+    added_formats = []
+    for attributes in map(get_xml_attributes, get_xml_children(new_styles_xml, "numFmts", "numFmt")):
+        if attributes["formatCode"] not in formats:
+            # Ids below 164 are built in
+            format_id = str(max([163] + [int(format_id) for format_id in formats.values()]) + 1)
+            formats[attributes["formatCode"]] = format_id
+            added_formats.append(f'<numFmt numFmtId="{format_id}" formatCode="{attributes["formatCode"]}"/>')
+        index_maps["numFmtId"][attributes["numFmtId"]] = formats[attributes["formatCode"]]
+    if added_formats:
+        styles_xml = add_xml_children(add_style_section(styles_xml, "numFmts"), "numFmts", added_formats, len(formats))
+
+    def remap(match):
+        return f'{match.group(1)}="{index_maps.get(match.group(1), {}).get(match.group(2), match.group(2))}"'
+
+    for section_tag, tag, index_attribute in STYLE_COLLECTIONS:
+        existing = get_xml_children(styles_xml, section_tag, tag)
+        positions = {}
+        for index, element in enumerate(existing):
+            positions.setdefault(element, index)
+        added = []
+        index_map = index_maps[index_attribute] = {}
+        for index, element in enumerate(get_xml_children(new_styles_xml, section_tag, tag)):
+            # Cell formats point at fonts, fills, borders, number formats & named styles added before them
+            element = re.sub(r'\b(fontId|fillId|borderId|numFmtId|xfId)="(\d+)"', remap, element)
+            if element not in positions:
+                positions[element] = len(existing) + len(added)
+                added.append(element)
+            index_map[str(index)] = str(positions[element])
+        if added:
+            styles_xml = add_xml_children(add_style_section(styles_xml, section_tag), section_tag, added, len(existing) + len(added))
+
+    # Named styles already in the workbook are kept as they are
+    style_names = {get_xml_attributes(element).get("name") for element in get_xml_children(styles_xml, "cellStyles", "cellStyle")}
+    added_styles = []
+    for element in get_xml_children(new_styles_xml, "cellStyles", "cellStyle"):
+        if get_xml_attributes(element).get("name") not in style_names:
+            added_styles.append(re.sub(r'\b(xfId)="(\d+)"', remap, element))
+    if added_styles:
+        styles_xml = add_xml_children(add_style_section(styles_xml, "cellStyles"), "cellStyles", added_styles, len(style_names) + len(added_styles))
+    return styles_xml, index_maps
+
+def remap_sheet_styles(sheet_xml, index_maps):
+    """ Points the cells, rows, columns & conditional formats of a new worksheet at the merged styles """
+    cell_styles = index_maps["s"]
+    sheet_xml = re.sub(r'(<(?:c|row)\b[^>]*?\ss=")(\d+)"', lambda match: f'{match.group(1)}{cell_styles.get(match.group(2), match.group(2))}"', sheet_xml)
+    sheet_xml = re.sub(r'(<col\b[^>]*?\sstyle=")(\d+)"', lambda match: f'{match.group(1)}{cell_styles.get(match.group(2), match.group(2))}"', sheet_xml)
+    return re.sub(r'(<cfRule\b[^>]*?\sdxfId=")(\d+)"', lambda match: f'{match.group(1)}{index_maps["dxfId"].get(match.group(2), match.group(2))}"', sheet_xml)
+
+def copy_sheet_part(source, target, index_maps):
+    """ Copies a new worksheet into the merged workbook a block of rows at a time, remapping its styles """
+    text = io.TextIOWrapper(source, encoding="utf-8")
+    pending = ""
+    first_block = True
+    while True:
+        block = text.read(1 << 20)
+        pending += block
+        # Cut after the last complete row so no tag is split
+        cut = pending.rfind("</row>") + len("</row>") if block else len(pending)
+        if cut < len("</row>"):
+            continue
+        part = remap_sheet_styles(pending[:cut], index_maps)
+        if first_block:
+            # Only the sheets already in the workbook keep their selected tab
+            part = re.sub(r'(<sheetView\b[^>]*?)\stabSelected="1"', r'\1', part, count=1)
+            first_block = False
+        target.write(part.encode("utf-8"))
+        pending = pending[cut:]
+        if not block:
+            break
+
+def get_part_path(target, base="xl"):
+    """ Gets the zip entry name of a relationship target """
+    return target.lstrip("/") if target.startswith("/") else f"{base}/{target}"
+
+def merge_xlsx_sheets(file_path, new_path, sheet_names, counters=None):
+    """ Copies the sheets of a new workbook into an existing workbook, replacing its sheets named sheet_names or "name (n)".
+    The other parts of the existing workbook are copied from zip to zip without being parsed. """
+    import html
+    import shutil
+    import zipfile
+    file_path = Path(file_path)
+    replaced_name = re.compile("|".join(rf"{re.escape(name)}(?: \(\d+\))?" for name in sheet_names))
+    temp_path = file_path.with_name(f"{file_path.name}.{os.getpid()}.tmp")
+    try:
+        with zipfile.ZipFile(file_path) as workbook_zip, zipfile.ZipFile(new_path) as new_zip:
+            part_names = set(workbook_zip.namelist())
+            if "xl/sharedStrings.xml" in new_zip.namelist():
+                raise WorkbookMergeError("New sheets use shared strings")
+            workbook_xml = workbook_zip.read("xl/workbook.xml").decode("utf-8")
+            rels_xml = workbook_zip.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+            types_xml = workbook_zip.read("[Content_Types].xml").decode("utf-8")
+            styles_xml = workbook_zip.read("xl/styles.xml").decode("utf-8")
+            new_workbook_xml = new_zip.read("xl/workbook.xml").decode("utf-8")
+            new_rels = {attributes["Id"]: attributes for attributes in map(get_xml_attributes, re.findall(r"<Relationship\b[^>]*>", new_zip.read("xl/_rels/workbook.xml.rels").decode("utf-8")))}
+            rels = {attributes["Id"]: attributes for attributes in map(get_xml_attributes, re.findall(r"<Relationship\b[^>]*>", rels_xml))}
+
+            # Sheets kept from the existing workbook, with the new sheets where the first replaced sheet was
+            sheet_tags = re.findall(r"<sheet\b[^>]*>", (find_xml_section(workbook_xml, "sheets") or [""])[0])
+            if not sheet_tags:
+                raise WorkbookMergeError("No sheets in the existing workbook")
+            removed_positions = [position for position, tag in enumerate(sheet_tags) if replaced_name.fullmatch(html.unescape(get_xml_attributes(tag)["name"]))]
+            kept_positions = [position for position in range(len(sheet_tags)) if position not in removed_positions]
+            insert_at = len([position for position in kept_positions if position < removed_positions[0]]) if removed_positions else len(kept_positions)
+            new_sheet_tags = re.findall(r"<sheet\b[^>]*>", find_xml_section(new_workbook_xml, "sheets").group())
+            positions = {old: new + (len(new_sheet_tags) if new >= insert_at else 0) for new, old in enumerate(kept_positions)}
+
+            removed_parts = set()
+            removed_rel_ids = set()
+            for position in removed_positions:
+                rel_id = next(value for name, value in get_xml_attributes(sheet_tags[position]).items() if name.endswith(":id"))
+                sheet_part = get_part_path(rels[rel_id]["Target"])
+                removed_rel_ids.add(rel_id)
+                removed_parts.update((sheet_part, sheet_part.replace("worksheets/", "worksheets/_rels/") + ".rels"))
+            # Excel rebuilds the calculation chain of removed formulas
+            for rel_id, attributes in rels.items():
+                if attributes["Type"].endswith("/calcChain"):
+                    removed_rel_ids.add(rel_id)
+                    removed_parts.add(get_part_path(attributes["Target"]))
+
+            # New sheets get unused sheet ids, relationship ids & part names
+            sheet_id = max(int(get_xml_attributes(tag)["sheetId"]) for tag in sheet_tags)
+            part_number = len(part_names)
+            added_sheets = []
+            added_tags = []
+            added_rels = []
+            added_types = []
+            for number, tag in enumerate(new_sheet_tags, start=1):
+                attributes = get_xml_attributes(tag)
+                new_rel_id = next(value for name, value in attributes.items() if name.endswith(":id"))
+                while f"xl/worksheets/sheet{part_number}.xml" in part_names:
+                    part_number += 1
+                part_name = f"xl/worksheets/sheet{part_number}.xml"
+                part_names.add(part_name)
+                rel_id = f"rIdFca{number}"
+                while rel_id in rels:
+                    rel_id += "_"
+                added_sheets.append((get_part_path(new_rels[new_rel_id]["Target"]), part_name))
+                added_tags.append(f'<sheet xmlns:r="{RELATIONSHIPS_NAMESPACE}" name="{attributes["name"]}" sheetId="{sheet_id + number}" r:id="{rel_id}"/>')
+                added_rels.append(f'<Relationship Id="{rel_id}" Type="{RELATIONSHIPS_NAMESPACE}/worksheet" Target="/{part_name}"/>')
+                added_types.append(f'<Override PartName="/{part_name}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>')
+            kept_tags = [sheet_tags[position] for position in kept_positions]
+            merged_sheets = "<sheets>" + "".join(kept_tags[:insert_at] + added_tags + kept_tags[insert_at:]) + "</sheets>"
+            sheets_section = find_xml_section(workbook_xml, "sheets")
+            workbook_xml = workbook_xml[:sheets_section.start()] + merged_sheets + workbook_xml[sheets_section.end():]
+
+            # Sheet-level names (e.g. autofilter ranges) follow their sheet to its new position
+            defined_names = []
+            for element in get_xml_children(workbook_xml, "definedNames", "definedName"):
+                local_sheet = re.search(r'\blocalSheetId="(\d+)"', element)
+                if local_sheet is None:
+                    defined_names.append(element)
+                elif int(local_sheet.group(1)) in positions:
+                    defined_names.append(element.replace(local_sheet.group(), f'localSheetId="{positions[int(local_sheet.group(1))]}"'))
+            for element in get_xml_children(new_workbook_xml, "definedNames", "definedName"):
+                local_sheet = re.search(r'\blocalSheetId="(\d+)"', element)
+                if local_sheet:
+                    defined_names.append(element.replace(local_sheet.group(), f'localSheetId="{int(local_sheet.group(1)) + insert_at}"'))
+            names_section = find_xml_section(workbook_xml, "definedNames")
+            merged_names = "<definedNames>" + "".join(defined_names) + "</definedNames>" if defined_names else ""
+            if names_section:
+                workbook_xml = workbook_xml[:names_section.start()] + merged_names + workbook_xml[names_section.end():]
+            else:
+                anchor = max(workbook_xml.find(end_tag) + len(end_tag) for end_tag in ("</sheets>", "</externalReferences>") if end_tag in workbook_xml)
+                workbook_xml = workbook_xml[:anchor] + merged_names + workbook_xml[anchor:]
+            active_tab = re.search(r'\bactiveTab="(\d+)"', workbook_xml)
+            if active_tab:
+                workbook_xml = workbook_xml.replace(active_tab.group(), f'activeTab="{positions.get(int(active_tab.group(1)), insert_at)}"')
+            workbook_xml = re.sub(r'\bfirstSheet="\d+"', 'firstSheet="0"', workbook_xml)
+
+            rels_xml = re.sub(r"<Relationship\b[^>]*>", lambda match: "" if get_xml_attributes(match.group())["Id"] in removed_rel_ids else match.group(), rels_xml)
+            rels_xml = rels_xml.replace("</Relationships>", "".join(added_rels) + "</Relationships>")
+            types_xml = re.sub(r"<Override\b[^>]*>", lambda match: "" if get_xml_attributes(match.group())["PartName"].lstrip("/") in removed_parts else match.group(), types_xml)
+            types_xml = types_xml.replace("</Types>", "".join(added_types) + "</Types>")
+            styles_xml, index_maps = merge_styles(styles_xml, new_zip.read("xl/styles.xml").decode("utf-8"))
+
+            rewritten_parts = {"xl/workbook.xml": workbook_xml, "xl/_rels/workbook.xml.rels": rels_xml, "[Content_Types].xml": types_xml, "xl/styles.xml": styles_xml}
+            with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as merged_zip:
+                for info in workbook_zip.infolist():
+                    if info.filename in removed_parts:
+                        continue
+                    if info.filename in rewritten_parts:
+                        merged_zip.writestr(info.filename, rewritten_parts[info.filename])
+                        continue
+                    # Stream unchanged parts without parsing them
+                    part_info = zipfile.ZipInfo(info.filename, info.date_time)
+                    part_info.compress_type = info.compress_type
+                    with workbook_zip.open(info) as source, merged_zip.open(part_info, "w", force_zip64=info.file_size >= 1 << 31) as target:
+                        shutil.copyfileobj(source, target, 1 << 20)
+                for new_part, part_name in added_sheets:
+                    with new_zip.open(new_part) as source, merged_zip.open(part_name, "w", force_zip64=True) as target:
+                        copy_sheet_part(source, target, index_maps)
+        os.replace(temp_path, file_path)
+    except (KeyError, StopIteration, zipfile.BadZipFile) as e:
+        raise WorkbookMergeError(f"Unexpected workbook layout: {e!r}") from e
+    finally:
+        if temp_path.exists():
+            os.remove(temp_path)
+    if counters is not None:
+        counters.update(kept_sheets=len(kept_positions), replaced_sheets=len(removed_positions), added_sheets=len(added_sheets))
+    return file_path
+
+def append_xlsx_sheets(file_path, sheets, metrics=None, summary_cells=None):
+    """ Adds or replaces sheets in an existing Excel spreadsheet without loading or re-saving its other sheets.
+    The sheets are streamed to a new workbook first, then copied into the existing one. """
+    metrics = metrics or StageMetrics()
+    with tempfile.TemporaryDirectory(prefix="ASPEN FCA ") as temp_dir:
+        new_path = write_xlsx_sheets(Path(temp_dir) / "Sheets.xlsx", sheets, metrics, summary_cells)
+        with metrics.stage("excel_merge", path=str(file_path)) as record:
+            merge_xlsx_sheets(file_path, new_path, list(sheets), counters=record)
+            record["bytes_written"] = os.path.getsize(file_path)
+    return file_path
+
+def write_xlsx_sheets(file_path, sheets, metrics=None, summary_cells=None):
+    """ Writes the fault data or summary of each {sheet name: DataFrame} to a new or existing Excel spreadsheet without any dialogs.
+    New spreadsheets are streamed row by row & sheets are copied into existing ones without loading them. Data past the Excel row limit continues on extra sheets.
+    summary_cells of {sheet name: [(label, value)]} replace the impedance cells next to a table. """
+    from openpyxl import Workbook, load_workbook
+    metrics = metrics or StageMetrics()
+    file_path = Path(file_path)
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+
+    if file_path.exists():
+        try:
+            return append_xlsx_sheets(file_path, sheets, metrics, summary_cells)
+        except WorkbookMergeError as e:
+            print(f"Loading the whole spreadsheet to add sheets: {e}")
+
+    write_only = not file_path.exists()
+    if write_only:
+        wb = Workbook(write_only=True)
+    else:
+        with metrics.stage("excel_load", path=str(file_path)):
+            wb = load_workbook(file_path)
+    with metrics.stage("excel_styles"):
+        register_named_styles(wb)
+
+    for sheet_name, dataframe in sheets.items():
+        sheet_count = max(1, -(-len(dataframe) // rows_per_sheet))
+        sheet_names = [sheet_name] + [f"{sheet_name} ({number})" for number in range(2, sheet_count + 1)]
+
+        # Impedance maximum & minimum next to the table
+        sheet_cells = []
+        if summary_cells and sheet_name in summary_cells:
+            sheet_cells = summary_cells[sheet_name]
+        elif "Impedance (Magnitude - Ohms secondary)" in dataframe.columns:
+            overall = summarize_faults(dataframe, group_columns=(), percentiles=())
+            sheet_cells = [
+                ("Maximum Impedance", overall.at[0, "Max Impedance (Ohms secondary)"]),
+                ("Minimum Impedance", overall.at[0, "Min Impedance (Ohms secondary)"])
+            ]
+
+        if not write_only:
+            # Replace the sheets from a previous run, keeping the position of the first one
+            sheet_index = wb.sheetnames.index(sheet_name) if sheet_name in wb.sheetnames else len(wb.sheetnames)
+            for name in wb.sheetnames:
+                if name == sheet_name or re.fullmatch(rf"{re.escape(sheet_name)} \(\d+\)", name):
+                    del wb[name]
+
+        for sheet_number, name in enumerate(sheet_names):
+            if write_only:
+                ws = wb.create_sheet(name)
+            else:
+                ws = wb.create_sheet(name, sheet_index + sheet_number)
+            start = sheet_number * rows_per_sheet
+            stop = min(start + rows_per_sheet, len(dataframe))
+            with metrics.stage("excel_styles", sheet=name):
+                style_fault_sheet(ws, len(dataframe.columns), stop - start + 1)
+            with metrics.stage("excel_write", sheet=name, rows=stop - start, write_only=write_only):
+                write_fault_sheet(ws, dataframe, start, stop, sheet_cells if sheet_number == 0 else [], write_only)
+
+    # Save workbook
+    with metrics.stage("excel_save", path=str(file_path)) as record:
+        wb.save(file_path)
+        record["bytes_written"] = os.path.getsize(file_path)
+    return file_path
+
+def get_sheet_name(name, used_names):
+    """ Makes a valid Excel sheet name from a relay name, unique among used_names (case insensitive) """
+    # Excel sheet names cannot contain []:*?/\ or start/end with '
+    base_name = re.sub(r"[\[\]:*?/\\]", "_", name).strip("' ")[:EXCEL_SHEET_NAME_LENGTH] or "Relay"
+    sheet_name = base_name
+    number = 2
+    while sheet_name.lower() in used_names:
+        suffix = f" {number}"
+        sheet_name = base_name[:EXCEL_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        number += 1
+    used_names.add(sheet_name.lower())
+    return sheet_name
@@ -0,0 +1,154 @@
+"""
+Writes & reads fault data as Excel, Parquet, Arrow IPC (Feather) or CSV files.
+"""
+import importlib.util
+import os
+from pathlib import Path
+
+from .excel import write_xlsx
+from .metrics import StageMetrics
+from .parsing import clean_tty_text, widen_measurements
+
+# External packages are imported where they are first used, so startup only pays for what a run needs
+REQUIRED_PACKAGES = ("numpy", "pandas")
+# Extra packages needed by each export format
+FORMAT_PACKAGES = {"xlsx": ("openpyxl",), "parquet": ("pyarrow",), "feather": ("pyarrow",), "csv": ()}
+
+def find_missing_packages(packages):
+    """ Checks which external packages are not installed, without importing them """
+    return [package for package in packages if importlib.util.find_spec(package) is None]
+
+# File extension of each export format. Arrow IPC files are written as Feather (version 2).
+OUTPUT_SUFFIXES = {"xlsx": ".xlsx", "parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+# Compression used when none is given
+DEFAULT_COMPRESSION = {"parquet": "zstd", "feather": "zstd", "csv": None}
+# Extension added to compressed CSV files
+CSV_COMPRESSION_SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz", "zstd": ".zst"}
+# Column types of fault data written to Parquet, Feather & CSV files
+FAULT_COLUMN_DTYPES = {
+    "TTY File": "category",
+    "Fault #": "int32",
+    "Fault Sim": "category",
+    "Faulted Line": "category",
+    "Fault Type": "category",
+    "Branch Outage": "category",
+    "Relay": "category",
+    "Operate Time (s)": "float64",
+    "Operate Zone": "category",
+    "Impedance (Magnitude - Ohms secondary)": "float64",
+    "Impedance (Angle)": "float64",
+    "Fault Current (3I0 - A)": "float64"
+}
+
+def get_output_format(file_path):
+    """ Gets the export format from the extension of an output file """
+    for suffix in reversed(Path(file_path).suffixes):
+        suffix = suffix.lower()
+        if suffix == ".arrow":
+            return "feather"
+        for output_format, format_suffix in OUTPUT_SUFFIXES.items():
+            if suffix == format_suffix:
+                return output_format
+    raise ValueError(f"ERROR: Unknown output format for '{file_path}'. Use .xlsx, .parquet, .feather, .arrow or .csv.")
+
+def get_output_suffix(output_format, compression=None):
+    """ Gets the file extension for an export format """
+    if output_format == "csv" and compression:
+        return OUTPUT_SUFFIXES["csv"] + CSV_COMPRESSION_SUFFIXES.get(compression, "")
+    return OUTPUT_SUFFIXES[output_format]
+
+def apply_fault_schema(dataframe):
+    """ Converts fault data columns to their FAULT_COLUMN_DTYPES types. float32 measurements are widened to their parsed values. """
+    import pandas as pd
+    columns = {}
+    for column_name in dataframe.columns:
+        column = dataframe[column_name]
+        if column.dtype == "float32":
+            column = pd.Series(widen_measurements(column), index=column.index)
+        columns[column_name] = column.astype(FAULT_COLUMN_DTYPES.get(column_name, "string"))
+    return pd.DataFrame(columns, copy=False)
+
+def get_arrow_schema(dataframe):
+    """ Makes the Arrow schema for the fault data columns. Categorical columns are stored as dictionaries. """
+    import pyarrow as pa
+    arrow_types = {"category": pa.dictionary(pa.int32(), pa.string()), "string": pa.string(), "int32": pa.int32(), "float64": pa.float64()}
+    return pa.schema([pa.field(column, arrow_types[FAULT_COLUMN_DTYPES.get(column, "string")]) for column in dataframe.columns])
+
+def write_faults(file_path, dataframe, output_format=None, compression=None, metrics=None):
+    """ Writes fault data to an Excel, Parquet, Arrow IPC (Feather) or CSV file. The format defaults to the file extension.
+    Columns are written with the FAULT_COLUMN_DTYPES types. openpyxl is only loaded for Excel files. """
+    output_format = output_format or get_output_format(file_path)
+    if output_format == "xlsx":
+        return write_xlsx(file_path, dataframe, metrics=metrics)
+    metrics = metrics or StageMetrics()
+    file_path = Path(file_path)
+    if output_format == "csv" and not compression:
+        # Compressed CSV files are named after their compression, e.g. "faults.csv.gz"
+        compression = next((name for name, suffix in CSV_COMPRESSION_SUFFIXES.items() if file_path.suffix.lower() == suffix), None)
+    compression = compression or DEFAULT_COMPRESSION[output_format]
+    if compression == "none":
+        compression = None
+
+    with metrics.stage("export", format=output_format, compression=compression, rows=len(dataframe)) as record:
+        dataframe = apply_fault_schema(dataframe)
+        if output_format == "csv":
+            dataframe.to_csv(file_path, index=False, compression=compression)
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(dataframe, schema=get_arrow_schema(dataframe), preserve_index=False)
+            if output_format == "parquet":
+                import pyarrow.parquet as pq
+                pq.write_table(table, file_path, compression=compression or "none")
+            else:
+                import pyarrow.feather as feather
+                feather.write_feather(table, file_path, compression=compression or "uncompressed")
+        record["bytes_written"] = os.path.getsize(file_path)
+    return file_path
+
+def get_saved_format(file_path):
+    """ Gets the export format of a saved summary file, or None for TTY text """
+    try:
+        return get_output_format(file_path)
+    except ValueError:
+        return None
+
+def read_faults(file_path):
+    """ Reads fault data saved by write_faults. Every Excel sheet with fault data is read, leaving out statistics sheets. """
+    import pandas as pd
+    output_format = get_output_format(file_path)
+    if output_format == "xlsx":
+        sheets = pd.read_excel(file_path, sheet_name=None, usecols=lambda column: column in FAULT_COLUMN_DTYPES)
+        frames = [frame for frame in sheets.values() if "Fault #" in frame.columns]
+        if not frames:
+            raise ValueError(f"ERROR: No fault data found in '{file_path}'.")
+        faults = pd.concat(frames, ignore_index=True)
+    elif output_format == "csv":
+        faults = pd.read_csv(file_path)
+    elif output_format == "parquet":
+        faults = pd.read_parquet(file_path)
+    else:
+        faults = pd.read_feather(file_path)
+    # Empty text is read back as missing
+    for column_name in faults.columns:
+        if FAULT_COLUMN_DTYPES.get(column_name) == "category":
+            faults[column_name] = faults[column_name].astype(object).fillna("").astype(str).astype("category")
+    return faults
+
+# Summary file name when none is given
+DEFAULT_SUMMARY_NAME = "Fault Summary - TTY Window"
+
+def create_xlsx(txt_location, dataframe, metrics=None, output_format="xlsx", compression=None, file_name=DEFAULT_SUMMARY_NAME):
+    """ Creates or appends to an Excel spreadsheet named file_name next to the TTY text file to display fault data.
+    Other export formats are written next to it the same way. Returns the file written. """
+    file_path = Path(txt_location).with_name(file_name + get_output_suffix(output_format, compression))
+    return write_faults(file_path, dataframe, output_format, compression, metrics)
+
+def load_fault_study(path, cache_dir=None, metrics=None):
+    """ Loads the fault data of a TTY text file, or of a summary file saved by this program """
+    metrics = metrics or StageMetrics()
+    if get_saved_format(path) is None:
+        return clean_tty_text(path, ["Fault description:"], None, cache_dir=cache_dir, metrics=metrics)
+    with metrics.stage("read_saved", path=str(path)) as record:
+        faults = read_faults(path)
+        record["rows"] = len(faults)
+    return faults
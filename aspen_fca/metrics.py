@@ -0,0 +1,61 @@
+"""
+Records the wall time & counters of each processing stage, as JSON lines and/or through a hook.
+"""
+import contextlib
+import importlib.util
+import json
+import sys
+import time
+
+class StageMetrics:
+    """ Records the wall time & counters of each processing stage. Records are kept, written as JSON lines and/or passed to a hook. """
+
+    def __init__(self, output=None, hook=None, **context):
+        # Fields added to every record, e.g. the TTY file of a batch worker
+        self.context = context
+        self.output = output
+        self.hook = hook
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, name, **counters):
+        """ Times the stage in the with block. Counters can be added to the record it yields. """
+        record = {"stage": name, **self.context, "started": time.time(), **counters}
+        start_time = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - start_time
+            self.emit(record)
+
+    def emit(self, record):
+        self.records.append(record)
+        if self.output:
+            self.output.write(json.dumps(record, default=str) + "\n")
+            self.output.flush()
+        if self.hook:
+            # Metrics must never stop a run
+            try:
+                self.hook(record)
+            except Exception as e:
+                print(f"Metrics hook failed: {e}")
+
+    def close(self):
+        if self.output and self.output is not sys.stderr:
+            self.output.close()
+
+def get_stage_metrics(metrics_path=None, hook_path=None):
+    """ Makes the stage metrics of a run. Records are appended to metrics_path ("-" for the terminal) & passed to the MODULE:FUNCTION hook. """
+    output = None
+    if metrics_path == "-":
+        output = sys.stderr
+    elif metrics_path:
+        output = open(metrics_path, "a", encoding="utf-8")
+    hook = None
+    if hook_path:
+        module_name, _, function_name = hook_path.partition(":")
+        hook = getattr(importlib.import_module(module_name), function_name)
+    return StageMetrics(output, hook)
@@ -0,0 +1,642 @@
+"""
+Parses the fault section of ASPEN OneLiner TTY window text into fault DataFrames.
+"""
+import contextlib
+import os
+import re
+from array import array
+from itertools import islice, repeat
+from pathlib import Path
+
+from .cache import get_cache_key, load_cached_faults, store_cached_faults
+from .metrics import StageMetrics
+
+# Fault description line grammar
+FAULT_HEADER_REGEX = re.compile(r'(\d+)\.\s(?!kV)(.*?):')
+FAULT_NUMBER_REGEX = re.compile(r'\b(\d+\.\s)(?!kV)')
+FAULT_SIM_REGEX = re.compile(r'\.\s.*?:')
+GROUND_FAULT_REGEX = re.compile(r'\dLG')
+LINE_FAULT_REGEX = re.compile(r'(?:kV|L)\s+LL')
+BUS_LINE_FAULT_REGEX = re.compile(r'kV\s+LL')
+LINE_FAULT_SUFFIX_REGEX = re.compile(r'\s+LL\s*')
+PERCENT_SPLIT_REGEX = re.compile(r'[()]')
+
+class CategoryBuffer:
+    """ Column buffer for strings repeated across faults: an int32 code per row & each distinct string once """
+
+    def __init__(self):
+        self.codes = array('i')
+        # String -> code, in order of first appearance
+        self.categories = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def append(self, value):
+        self.codes.append(self.categories.setdefault(value, len(self.categories)))
+
+    def extend(self, values):
+        categories = self.categories
+        self.codes.extend([categories.setdefault(value, len(categories)) for value in values])
+
+    def extend_buffer(self, other):
+        """ Appends another buffer, mapping its codes to the categories of this one """
+        mapping = [self.categories.setdefault(value, len(self.categories)) for value in other.categories]
+        if mapping == list(range(len(mapping))):
+            self.codes.extend(other.codes)
+        else:
+            self.codes.extend([mapping[code] for code in other.codes])
+
+    def __iter__(self):
+        values = list(self.categories)
+        return (values[code] for code in self.codes)
+
+def get_frame_columns(columns):
+    """ Wraps column buffers as numpy arrays & Categoricals without copying their values """
+    import numpy as np
+    import pandas as pd
+    for column_name, values in columns.items():
+        if isinstance(values, array) and values.typecode == 'd':
+            columns[column_name] = narrow_measurements(np.frombuffer(values, dtype=values.typecode))
+        elif isinstance(values, array):
+            columns[column_name] = np.frombuffer(values, dtype=values.typecode)
+        elif isinstance(values, CategoryBuffer):
+            columns[column_name] = pd.Categorical.from_codes(np.frombuffer(values.codes, dtype=values.codes.typecode), list(values.categories))
+    return columns
+
+def parse_fault_line(line):
+    """ Gets the Fault #, fault sim, faulted line & fault type from a fault description line. """
+    # Fault # & fault sim normally lead the line, e.g. "12. Interm. Fault on:"
+    header = FAULT_HEADER_REGEX.match(line)
+    if header:
+        fault_num = header.group(1)
+        fault_sim = header.group(2)[:-3]
+    else:
+        current = FAULT_NUMBER_REGEX.search(line)
+        fault_num = current.group().split(".")[0] if current else ""
+        current = FAULT_SIM_REGEX.search(line)
+        fault_sim = current.group()[2:-4] if current else ""
+    if fault_sim and "interm." in fault_sim.lower():
+        # Get percent on the line for Interm Faults
+        percent_line = "".join([phrase for phrase in line.split() if "%" in phrase])
+        percent = next((p for p in reversed(PERCENT_SPLIT_REGEX.split(percent_line)) if "%" in p))
+        fault_sim = f"{fault_sim} {percent}"
+
+    # Get faulted line & fault type
+    bus_start = line.rfind("on:") + 3
+    bus_end = line.rfind("kV ") + 6
+    faulted_line = line[bus_start:bus_end].strip()
+    current = GROUND_FAULT_REGEX.search(line)
+    if current:
+        fault_type = current.group()
+    else:
+        fault_type = "LL" if LINE_FAULT_REGEX.search(line) else ""
+    # Drop the fault type from the faulted line
+    if current and GROUND_FAULT_REGEX.search(line, bus_start, bus_end):
+        faulted_line = GROUND_FAULT_REGEX.sub('', faulted_line)
+    elif BUS_LINE_FAULT_REGEX.search(line, bus_start, bus_end):
+        faulted_line = LINE_FAULT_SUFFIX_REGEX.sub('', faulted_line)
+    return fault_num, fault_sim, faulted_line, fault_type
+
+def parse_outage_line(line):
+    """ Gets the outaged branch from a branch outage line. """
+    if line == "":
+        return ""
+    return line[line.lower().rfind("outage:"):].replace("outage:", "").strip()
+
+def parse_fault_descriptions(lines, counters=None):
+    """ Parses the Fault Description section of TTY window text file in a single pass over its lines. Returns its columns as typed buffers.
+    Fault lines that could not be parsed are counted in counters["dropped_faults"]. """
+    fault_desc_nums = array('i')
+    fault_sims = CategoryBuffer()
+    faulted_lines = CategoryBuffer()
+    fault_types = CategoryBuffer()
+    contingencies = CategoryBuffer()
+    dropped_faults = 0
+
+    def add_fault(fault_line, end_open, outage_line):
+        nonlocal dropped_faults
+        fault_desc_num, fault_sim, f_line, fault_type = parse_fault_line(fault_line)
+        if fault_desc_num == "" or fault_sim == "" or f_line == "" or fault_type == "":
+            dropped_faults += 1
+            return
+        if end_open:
+            suffix = "with end opened"
+            if '%' in fault_sim:
+                *sim_words, percent = fault_sim.split()
+                fault_sim = f"{' '.join(sim_words)} {suffix} {percent}"
+            else:
+                fault_sim = f"{fault_sim} {suffix}"
+        fault_desc_nums.append(int(fault_desc_num))
+        fault_sims.append(fault_sim)
+        faulted_lines.append(f_line)
+        fault_types.append(fault_type)
+        contingencies.append(parse_outage_line(outage_line))
+
+    # Fault lines waiting on the "with end opened" & branch outage lines that follow them
+    pending = []
+    for line in lines:
+        lowered = line.lower()
+        if pending:
+            is_outage = "branch" in lowered and "outage" in lowered
+            still_pending = []
+            for fault in pending:
+                if is_outage:
+                    add_fault(fault[0], fault[1], line.strip())
+                elif not fault[1] and "with end opened" in lowered:
+                    fault[1] = True
+                    still_pending.append(fault)
+                else:
+                    add_fault(fault[0], fault[1], "")
+            pending = still_pending
+        if "on:" in lowered:
+            pending.append([line.strip(), False])
+    for fault in pending:
+        add_fault(fault[0], fault[1], "")
+
+    if counters is not None:
+        counters["dropped_faults"] = dropped_faults
+    if not fault_desc_nums:
+        raise ValueError("ERROR: No fault description data could be parsed from the TTY text.")
+    return {
+        "Fault #": fault_desc_nums,
+        "Fault Sim": fault_sims,
+        "Faulted Line": faulted_lines,
+        "Fault Type": fault_types,
+        "Branch Outage": contingencies
+    }
+
+def get_fault_descriptions(lines, counters=None):
+    """ Makes a DataFrame for fault description information, with int32 fault numbers & categorical text columns """
+    import pandas as pd
+    return pd.DataFrame(get_frame_columns(parse_fault_descriptions(lines, counters)), copy=False)
+
+FAULT_TABLE_NUMBER_REGEX = re.compile(r'Fault\s+(\d+)')
+
+def get_relay_name(relay_line, curve_type):
+    """ Gets the relay name at the start of a fault table relay line """
+    if curve_type:
+        relay_name = relay_line.split(":")[0].split()
+    else:
+        relay_name = relay_line.split(".")[0].split()
+    # Drop the first zone / fault current
+    return " ".join(relay_name[:-1])
+
+# Fault table lines per chunk parsed in a worker process. Smaller tables are parsed in this process.
+TABLE_CHUNK_LINES = 250000
+# Block errors kept for the report; later ones are only counted
+MAX_BLOCK_ERRORS = 20
+
+def is_table_header(line):
+    """ Checks whether a fault table line starts a block, e.g. "Fault  1   Fault  2" """
+    return "Fault" in line and FAULT_TABLE_NUMBER_REGEX.search(line) is not None
+
+def parse_table_block(lines, start, block_fault_nums, curve_type, relay_column, columns):
+    """ Parses one 4 line fault table block into the column buffers: fault numbers on line 1, relay line on line 3, impedance/time line on line 4.
+    Returns the number of entries added. Raises ValueError if the block is malformed, when only measurement buffers can have been extended. """
+    relay_line = lines[start + 2]
+    if curve_type:
+        # Get zone & time pairs following the relay name, e.g. "RELAY  Z1: 0.020s  Z2: 0.350s"
+        zone_end = relay_line.find(":")
+        if zone_end == -1:
+            time_parts = relay_line[-3:].split()
+        else:
+            time_parts = relay_line[max(zone_end - 3, 0):].replace(":", " ").split()
+        # Get impedance magnitude & angle pairs, e.g. "5.123@ 78.2"
+        imp_parts = lines[start + 3].replace("@", " ").split()
+        count = min(len(block_fault_nums), len(time_parts) // 2, len(imp_parts) // 2)
+        # Measurements first: their conversion is the only step that can fail
+        columns["Operate Time (s)"].extend(map(float, map(str.strip, time_parts[1:2 * count:2], repeat("s"))))
+        columns["Impedance (Magnitude - Ohms secondary)"].extend(map(float, imp_parts[0:2 * count:2]))
+        columns["Impedance (Angle)"].extend(map(float, imp_parts[1:2 * count:2]))
+        columns["Operate Zone"].extend(time_parts[0:2 * count:2])
+    else:
+        time_parts = lines[start + 3].split()
+        # Get Fault Current (3I0)
+        fault_current_line = [entry for entry in relay_line.split() if "." in entry]
+        count = min(len(block_fault_nums), len(time_parts), len(fault_current_line))
+        columns["Operate Time (s)"].extend(map(float, map(str.strip, time_parts[:count], repeat("s"))))
+        columns["Fault Current (3I0 - A)"].extend(map(float, map(str.strip, fault_current_line[:count], repeat("A"))))
+    columns["Fault #"].extend(map(int, block_fault_nums[:count]))
+    if relay_column:
+        columns["Relay"].extend(repeat(get_relay_name(relay_line, curve_type), count))
+    return count
+
+def parse_table_chunk(lines, curve_type, relay_column=False, first_line=0):
+    """ Parses the fault table blocks in lines. Returns typed column buffers & counters.
+    Blocks start at each line with fault numbers, so a malformed block is reported & skipped without shifting the blocks after it. """
+    # Column buffers. Measurements are narrowed to float32 once parsed, if float32 holds every value.
+    columns = {"Relay": CategoryBuffer()} if relay_column else {}
+    columns.update({"Fault #": array('i'), "Operate Time (s)": array('d')})
+    if curve_type:
+        columns.update({"Operate Zone": CategoryBuffer(), "Impedance (Magnitude - Ohms secondary)": array('d'), "Impedance (Angle)": array('d')})
+    else:
+        columns["Fault Current (3I0 - A)"] = array('d')
+    fault_entries = 0
+    empty_blocks = 0
+    bad_blocks = 0
+    block_errors = []
+
+    measurement_columns = [values for values in columns.values() if isinstance(values, array) and values.typecode == 'd']
+    fault_nums = columns["Fault #"]
+    starts = [line_number for line_number, line in enumerate(lines) if "Fault" in line and FAULT_TABLE_NUMBER_REGEX.search(line)]
+    stray_lines = starts[0] if starts else len(lines)
+    for start, end in zip(starts, starts[1:] + [len(lines)]):
+        block_fault_nums = FAULT_TABLE_NUMBER_REGEX.findall(lines[start])
+        fault_entries += len(block_fault_nums)
+        try:
+            if end - start < 4:
+                raise ValueError(f"expected a 4 line block, found {end - start} lines")
+            count = parse_table_block(lines, start, block_fault_nums, curve_type, relay_column, columns)
+        except ValueError as e:
+            # Drop the measurements converted before the bad value, so the columns stay paired
+            for values in measurement_columns:
+                del values[len(fault_nums):]
+            bad_blocks += 1
+            if len(block_errors) < MAX_BLOCK_ERRORS:
+                block_errors.append(f"Fault table line {first_line + start + 1} (Faults {', '.join(block_fault_nums)}): {e}")
+            continue
+        # Lines after the 4th, e.g. text after the last block
+        stray_lines += end - start - 4
+        empty_blocks += count == 0
+    counters = {
+        "blocks": len(starts),
+        "dropped_entries": fault_entries - len(fault_nums),
+        "empty_blocks": empty_blocks,
+        "bad_blocks": bad_blocks,
+        "stray_lines": stray_lines,
+        "block_errors": block_errors
+    }
+    return columns, counters
+
+def split_table_chunks(lines, chunk_lines=TABLE_CHUNK_LINES):
+    """ Splits fault table lines into chunks of about chunk_lines, at block boundaries. Returns (first line, lines) for each chunk. """
+    bounds = [0]
+    for line_number in range(chunk_lines, len(lines), chunk_lines):
+        # Move forward to the next block
+        line_number = max(line_number, bounds[-1] + 1)
+        while line_number < len(lines) and not is_table_header(lines[line_number]):
+            line_number += 1
+        if line_number < len(lines):
+            bounds.append(line_number)
+    bounds.append(len(lines))
+    return [(start, lines[start:end]) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def append_columns(columns, chunk_columns):
+    """ Appends the column buffers of a later chunk to columns """
+    for column_name, values in chunk_columns.items():
+        if isinstance(values, CategoryBuffer):
+            columns[column_name].extend_buffer(values)
+        else:
+            columns[column_name].extend(values)
+
+def parse_fault_table(lines, curve_type, counters=None, relay_column=False, workers=1, chunk_lines=TABLE_CHUNK_LINES):
+    """ Iterate over fault table section to find lines containing pertinent information. Returns typed column buffers.
+    Large tables are split into chunks of whole blocks that are parsed in up to workers processes (None for the number of CPUs) & joined in order.
+    Fault numbers without values, blocks without any entries, malformed blocks & lines outside blocks are counted in counters. """
+    chunks = split_table_chunks(lines, chunk_lines)
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(parse_table_chunk, [chunk for _, chunk in chunks], repeat(curve_type), repeat(relay_column), [first_line for first_line, _ in chunks]))
+    else:
+        results = [parse_table_chunk(chunk, curve_type, relay_column, first_line) for first_line, chunk in chunks]
+
+    columns, table_counters = results[0] if results else parse_table_chunk([], curve_type, relay_column)
+    for chunk_columns, chunk_counters in results[1:]:
+        append_columns(columns, chunk_columns)
+        for name, value in chunk_counters.items():
+            table_counters[name] += value
+    del table_counters["block_errors"][MAX_BLOCK_ERRORS:]
+    if counters is not None:
+        counters.update(table_counters, chunks=len(chunks), workers=workers)
+    if not columns["Fault #"]:
+        message = "ERROR: No relay fault data could be parsed from the TTY text."
+        if table_counters["block_errors"]:
+            message += f" {table_counters['bad_blocks']} blocks could not be parsed, e.g. {table_counters['block_errors'][0]}"
+        raise ValueError(message)
+    return columns
+
+def get_fault_table(lines, curve_type, counters=None, relay_column=False, workers=1):
+    """ Makes a DataFrame over the fault table column buffers without copying them """
+    import pandas as pd
+    fault_table = pd.DataFrame(get_frame_columns(parse_fault_table(lines, curve_type, counters, relay_column, workers)), copy=False)
+    return fault_table
+
+# Fault table blocks checked for impedance values
+CURVE_DETECT_BLOCKS = 100
+
+def detect_curve_type(lines):
+    """ Checks the fault table section for impedance values to tell Distance Curve output from Overcurrent Curve output. """
+    # Distance Curve blocks list impedances as "magnitude@angle" on the 4th line of each block, wherever the block starts
+    starts = (line_number for line_number, line in enumerate(lines) if is_table_header(line))
+    return any("@" in lines[start + 3] for start in islice(starts, CURVE_DETECT_BLOCKS) if start + 3 < len(lines))
+
+def split_fault_section(fault_section):
+    """ Splits the last fault study into the lines of its fault description & fault table sections """
+    # Find where the fault table begins
+    fault_table_start = fault_section.rfind("Fault  1 ")
+    if fault_table_start == -1:
+        raise ValueError("ERROR: The string 'Fault  1 ' was not found in the TTY text.")
+    # Separate into lists of non-empty lines
+    description_lines = [line for line in fault_section[:fault_table_start].strip().splitlines() if line.strip()]
+    table_lines = [line for line in fault_section[fault_table_start:].strip().splitlines() if line.strip()]
+    return description_lines, table_lines
+
+# Phrase the fault section of the TTY window text starts at
+FAULT_SECTION_START = ("Fault description:",)
+# Compression of TTY text files by suffix, e.g. "TTY Window.txt.gz". They are decompressed as they are read.
+TTY_COMPRESSION_SUFFIXES = {".gz": "gzip", ".xz": "xz", ".zst": "zstd"}
+
+def split_archive_path(tty_text_path):
+    """ Splits the path of a TTY text file in a zip archive, e.g. "Studies.zip/2024/TTY Window.txt", into the archive & member name.
+    Returns (archive, None) for an archive itself & (None, None) for files outside zip archives. """
+    parts = Path(tty_text_path).parts
+    for index, part in enumerate(parts):
+        if part.lower().endswith(".zip"):
+            archive_path = Path(*parts[:index + 1])
+            if archive_path.is_file():
+                return archive_path, "/".join(parts[index + 1:]) or None
+    return None, None
+
+def is_tty_file_name(name):
+    """ Checks whether a file name is TTY text, plain or compressed, or a zip archive of it """
+    name = name.lower()
+    return name.endswith((".txt", ".zip")) or name.endswith(tuple(f".txt{suffix}" for suffix in TTY_COMPRESSION_SUFFIXES))
+
+def list_archive_members(archive_path):
+    """ Gets the TTY text files in a zip archive as archive/member paths. A file that is not a zip archive is returned as is, to fail when read. """
+    import zipfile
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            return [Path(archive_path, *name.split("/")) for name in archive.namelist() if name.lower().endswith(".txt")]
+    except zipfile.BadZipFile:
+        return [Path(archive_path)]
+
+def get_tty_name(tty_text_path):
+    """ Gets the name of a TTY text file without its .txt & compression suffixes.
+    Zip archive members are named after the archive & member, e.g. "Studies - 2024 - TTY Window" for "Studies.zip/2024/TTY Window.txt". """
+    archive_path, member = split_archive_path(tty_text_path)
+    if archive_path and not member:
+        return archive_path.stem
+    if archive_path:
+        return " - ".join([archive_path.stem] + (member[:-4] if member.lower().endswith(".txt") else member).split("/"))
+    name = Path(tty_text_path).name
+    if Path(name).suffix.lower() in TTY_COMPRESSION_SUFFIXES:
+        name = Path(name).stem
+    return Path(name).stem
+
+def get_tty_folder(tty_text_path):
+    """ Gets the folder of a TTY text file, or of the zip archive it is in """
+    archive_path, _ = split_archive_path(tty_text_path)
+    return (archive_path or Path(tty_text_path)).parent
+
+def is_compressed_tty_file(tty_text_path):
+    """ Checks whether a TTY text file is compressed or in a zip archive """
+    return Path(tty_text_path).suffix.lower() in TTY_COMPRESSION_SUFFIXES or split_archive_path(tty_text_path)[0] is not None
+
+@contextlib.contextmanager
+def open_compressed_tty_file(tty_text_path):
+    """ Opens a compressed TTY text file or zip archive member, whose bytes are decompressed as they are read. An archive with one TTY text file opens that file. """
+    # Only imported for compressed TTY text, to keep startup fast
+    import gzip
+    import lzma
+    import zipfile
+    archive_path, member = split_archive_path(tty_text_path)
+    if archive_path:
+        try:
+            archive = zipfile.ZipFile(archive_path)
+        except zipfile.BadZipFile:
+            raise ValueError(f"ERROR: '{archive_path}' is not a zip archive.") from None
+        with archive:
+            if member is None:
+                members = [name for name in archive.namelist() if name.lower().endswith(".txt")]
+                if len(members) != 1:
+                    raise ValueError(f"ERROR: '{archive_path}' has {len(members)} TTY text files. Name one, e.g. '{archive_path}/{members[0] if members else 'TTY Window.txt'}'.")
+                member = members[0]
+            try:
+                file = archive.open(member)
+            except KeyError:
+                raise FileNotFoundError(f"ERROR: '{archive_path}' has no TTY text file '{member}'.") from None
+            with file:
+                yield file
+        return
+    compression = TTY_COMPRESSION_SUFFIXES[Path(tty_text_path).suffix.lower()]
+    if compression == "gzip":
+        file = gzip.open(tty_text_path, 'rb')
+    elif compression == "xz":
+        file = lzma.open(tty_text_path, 'rb')
+    else:
+        # zstd is only in the standard library from Python 3.14 on, so it is streamed through pyarrow
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError("ERROR: Reading .zst TTY text needs pyarrow: pip install pyarrow") from None
+        file = pa.CompressedInputStream(pa.OSFile(str(tty_text_path)), "zstd")
+    with file:
+        yield file
+
+def read_compressed_fault_section(tty_text_path, fault_start, block_size=1 << 20, counters=None):
+    """ Decompresses TTY window text forwards in blocks, as compressed streams cannot be read backwards. Returns the text of the last simulated fault study only.
+    Nothing is written to disk & only the text from the last start of a fault study is kept. The bytes decompressed & compressed file size are added to counters. """
+    markers = [phrase.encode('utf-8') for phrase in fault_start]
+    overlap_size = max(len(marker) for marker in markers) - 1
+    found = set()
+    # Text from the last start of a fault study, or only the end of the last block until one is found
+    section = bytearray()
+    section_found = False
+    bytes_decompressed = 0
+    with open_compressed_tty_file(tty_text_path) as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            bytes_decompressed += len(block)
+            # Include the end of the previous block so phrases split across blocks are found
+            search_start = max(len(section) - overlap_size, 0)
+            section += block
+            section_start = -1
+            for idx, marker in enumerate(markers):
+                offset = section.rfind(marker, search_start)
+                if offset != -1:
+                    found.add(idx)
+                    if idx == 0:
+                        section_start = offset
+            if section_start != -1:
+                # A later fault study starts here
+                del section[:section_start]
+                section_found = True
+            elif not section_found:
+                del section[:max(len(section) - overlap_size, 0)]
+    if counters is not None:
+        counters.update(bytes_decompressed=bytes_decompressed, file_bytes=os.path.getsize(split_archive_path(tty_text_path)[0] or tty_text_path))
+
+    for idx in range(len(markers) - 1, -1, -1):
+        if idx not in found:
+            raise ValueError(f"ERROR: The string '{fault_start[idx]}' was not found in the TTY text.")
+    return section.decode('utf-8')
+
+def read_fault_section(tty_text_path, fault_start, block_size=1 << 20, counters=None):
+    """ Scans the TTY window text file backwards in blocks. Returns the text of the last simulated fault study only.
+    The bytes read & file size are added to counters. Compressed files & zip archive members are decompressed forwards instead. """
+    if is_compressed_tty_file(tty_text_path):
+        return read_compressed_fault_section(tty_text_path, fault_start, block_size, counters)
+    markers = [phrase.encode('utf-8') for phrase in fault_start]
+    overlap_size = max(len(marker) for marker in markers) - 1
+    marker_offsets = {}
+    chunks = []
+    with open(tty_text_path, 'rb') as file:
+        file_bytes = position = file.seek(0, os.SEEK_END)
+        overlap = b""
+        # Read blocks from the end of the file until every phrase has been found
+        while position > 0 and len(marker_offsets) < len(markers):
+            read_size = min(block_size, position)
+            position -= read_size
+            file.seek(position)
+            chunk = file.read(read_size)
+            # Include the start of the previous block so phrases split across blocks are found
+            window = chunk + overlap
+            # Blocks before the start of the last fault study are only scanned, not kept
+            if 0 not in marker_offsets:
+                chunks.append(chunk)
+                section_position = position
+            for idx, marker in enumerate(markers):
+                if idx in marker_offsets:
+                    continue
+                offset = window.rfind(marker)
+                if offset != -1:
+                    marker_offsets[idx] = position + offset
+            overlap = window[:overlap_size]
+        if counters is not None:
+            counters.update(bytes_read=file_bytes - position, file_bytes=file_bytes)
+
+    for idx in range(len(markers) - 1, -1, -1):
+        if idx not in marker_offsets:
+            raise ValueError(f"ERROR: The string '{fault_start[idx]}' was not found in the TTY text.")
+
+    # Keep the text starting from the first phrase
+    content = b"".join(reversed(chunks))
+    return content[marker_offsets[0] - section_position:].decode('utf-8')
+
+def merge_faults(fault_description_frame, fault_table_frame):
+    """ Matches fault descriptions to fault table entries by joining both on a Fault # index """
+    faults_frame = fault_description_frame.set_index("Fault #").join(fault_table_frame.set_index("Fault #"), how='inner')
+    # The index is widened to int64, so narrow the Fault # column again
+    return faults_frame.reset_index().astype({"Fault #": "int32"})
+
+def clean_tty_text(tty_text_path, fault_start=FAULT_SECTION_START, curve_type=None, trimmed_path=None, cache_dir=None, metrics=None, relay_column=False, table_workers=None):
+    """ Reads the last fault study in the TTY window text file. Stores, parses, & organizes last simulated fault data.
+    A curve_type of None detects Distance vs Overcurrent Curve output from the text. relay_column adds the relay name of each fault table entry.
+    Large fault tables are parsed in up to table_workers processes (None for the number of CPUs).
+    With a cache_dir, fault data already parsed from the same fault section is loaded instead of parsed again. """
+    metrics = metrics or StageMetrics()
+    # Read only the tail of the TTY window text saved
+    with metrics.stage("read", path=str(tty_text_path)) as record:
+        new_content = read_fault_section(tty_text_path, fault_start, counters=record)
+
+    # Write fault info to a separate txt file if requested
+    if trimmed_path:
+        with open(trimmed_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(new_content)
+        print(f"Trimmed TTY text saved at: {trimmed_path}")
+
+    print("TTY text file read.")
+
+    # Reuse fault data parsed from the same fault section
+    if cache_dir:
+        with metrics.stage("cache_lookup") as record:
+            cache_key = get_cache_key(new_content, curve_type, relay_column)
+            faults_frame = load_cached_faults(cache_dir, cache_key)
+            record["hit"] = faults_frame is not None
+        if faults_frame is not None:
+            print(len(faults_frame), "Faults loaded from cache.")
+            return faults_frame
+
+    with metrics.stage("split") as record:
+        description_lines, table_lines = split_fault_section(new_content)
+        record.update(description_lines=len(description_lines), table_lines=len(table_lines))
+
+    # Parse fault description section of TTY Window
+    with metrics.stage("parse_descriptions", lines=len(description_lines)) as record:
+        fault_description_frame = get_fault_descriptions(description_lines, counters=record)
+        record["rows"] = len(fault_description_frame)
+    print(len(fault_description_frame), "Fault descriptions found.")
+
+    # Parse fault table section of TTY window
+    with metrics.stage("parse_table", lines=len(table_lines)) as record:
+        if curve_type is None:
+            curve_type = detect_curve_type(table_lines)
+        fault_table_frame = get_fault_table(table_lines, curve_type, counters=record, relay_column=relay_column, workers=table_workers)
+        record.update(rows=len(fault_table_frame), distance_curve=bool(curve_type))
+    print(len(fault_table_frame), "Fault table entries found.")
+    if record["bad_blocks"]:
+        print(f"WARNING: {record['bad_blocks']} fault table blocks could not be parsed & were skipped:")
+        for block_error in record["block_errors"]:
+            print(f"  {block_error}")
+
+    # Match & merge DataFrames
+    with metrics.stage("merge", description_rows=len(fault_description_frame), table_rows=len(fault_table_frame)) as record:
+        faults_frame = merge_faults(fault_description_frame, fault_table_frame)
+        record.update(rows=len(faults_frame),
+                      unmatched_descriptions=max(len(fault_description_frame) - len(faults_frame), 0),
+                      unmatched_table_entries=max(len(fault_table_frame) - len(faults_frame), 0))
+
+    # Relay named on the first relay line, kept with cached fault data for the study store
+    faults_frame.attrs["relay"] = get_relay_name(table_lines[2], curve_type) if len(table_lines) > 2 else ""
+
+    if cache_dir:
+        with metrics.stage("cache_store", rows=len(faults_frame)):
+            store_cached_faults(cache_dir, cache_key, faults_frame)
+    return faults_frame
+
+# Significant digits a float32 measurement keeps exactly
+FLOAT32_DIGITS = 6
+
+def narrow_measurements(values):
+    """ Stores float64 measurements as float32 when every value has at most FLOAT32_DIGITS significant digits, so widen_measurements gives them back exactly.
+    Otherwise they stay float64. """
+    import numpy as np
+    narrowed = values.astype("float32")
+    return narrowed if np.array_equal(widen_measurements(narrowed), values, equal_nan=True) else values
+
+def widen_measurements(values):
+    """ Converts float32 measurements to float64 at the decimal values they were parsed from, e.g. 0.02 instead of 0.0199999995529651.
+    Other measurements are only converted to float64, as their values are not rounded. """
+    import numpy as np
+    values = np.asarray(values)
+    if values.dtype != "float32":
+        return values.astype("float64")
+    values = values.astype("float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        digits = FLOAT32_DIGITS - 1 - np.floor(np.log10(np.abs(values)))
+    # Zero & missing values have no digits to round
+    digits = np.nan_to_num(digits, nan=0.0, posinf=0.0, neginf=0.0)
+    # Powers of 10 are exact, so dividing by one rounds to the nearest float64
+    scale = 10.0 ** np.abs(digits)
+    return np.where(digits >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale)
+
+# Decimal places differences of measurements are rounded to
+DIFFERENCE_DECIMALS = 6
+
+def round_differences(values):
+    """ Rounds differences of measurements to DIFFERENCE_DECIMALS, e.g. 0.3 instead of 0.29999999999999993 for 0.7 - 0.4 """
+    import numpy as np
+    return np.round(np.asarray(values, dtype="float64"), DIFFERENCE_DECIMALS)
+
+def share_categories(frames):
+    """ Gives the categorical columns of several fault frames the same categories, so they can be stacked or compared """
+    import pandas as pd
+    for column_name in frames[0].columns:
+        columns = [frame[column_name] for frame in frames if column_name in frame.columns]
+        if all(isinstance(column.dtype, pd.CategoricalDtype) for column in columns):
+            categories = columns[0].cat.categories.append([column.cat.categories for column in columns[1:]]).unique()
+            for frame in frames:
+                if column_name in frame.columns:
+                    frame[column_name] = frame[column_name].cat.set_categories(categories)
+
+def concat_faults(frames):
+    """ Stacks fault data from several TTY files. Categorical columns get the same categories first so they stay categorical. """
+    import pandas as pd
+    share_categories(frames)
+    return pd.concat(frames, ignore_index=True)
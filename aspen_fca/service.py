@@ -0,0 +1,159 @@
+"""
+Local parse service: keeps the parser & its packages loaded and answers parse requests from notebooks & other tools over localhost HTTP.
+Usage: python "ASPEN FCA.py" serve [--port 8765], then aspen_fca.service.request_faults("TTY Window.txt") or POST /parse.
+"""
+import http.server
+import importlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+
+from .cache import PARSER_VERSION
+from .export import REQUIRED_PACKAGES, apply_fault_schema, get_arrow_schema
+from .metrics import StageMetrics
+from .parsing import clean_tty_text, split_archive_path
+from .watch import get_file_signature
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+# Fault studies kept in memory, least recently used dropped first
+SERVICE_MEMORY_STUDIES = 16
+# Curve type of each curve name in a request
+SERVICE_CURVES = {None: None, "distance": True, "overcurrent": False}
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+class ParseService:
+    """ Parses TTY text files for requests. The fault data of unchanged files is answered from memory. """
+
+    def __init__(self, cache_dir=None, memory_studies=SERVICE_MEMORY_STUDIES, metrics=None):
+        self.cache_dir = cache_dir
+        self.memory_studies = memory_studies
+        self.metrics = metrics or StageMetrics()
+        # (TTY file, curve type, relay column) -> (file signature, fault data)
+        self.studies = OrderedDict()
+        self.lock = threading.Lock()
+        # Request threads pass their records to the service metrics one at a time
+        self.metrics_lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+
+    def parse(self, tty_path, curve_type=None, relay_column=False):
+        """ Gets the fault data of a TTY text file, parsing it again only when it changed """
+        tty_path = os.path.abspath(tty_path)
+        # Zip archive members change with their archive
+        signature = get_file_signature(split_archive_path(tty_path)[0] or tty_path)
+        if signature is None:
+            raise FileNotFoundError(f"ERROR: TTY text file '{tty_path}' not found.")
+        key = (tty_path, curve_type, relay_column)
+        with self.lock:
+            self.requests += 1
+            study = self.studies.get(key)
+            if study and study[0] == signature:
+                self.studies.move_to_end(key)
+                return study[1]
+        # Each request records its stages on its own, as requests are parsed in parallel threads
+        request_metrics = StageMetrics()
+        try:
+            faults = clean_tty_text(tty_path, curve_type=curve_type, cache_dir=self.cache_dir, metrics=request_metrics, relay_column=relay_column)
+        finally:
+            with self.metrics_lock:
+                for record in request_metrics.records:
+                    self.metrics.emit(record)
+                # A long-running service keeps no history of its records
+                self.metrics.records.clear()
+        with self.lock:
+            self.studies[key] = (signature, faults)
+            self.studies.move_to_end(key)
+            while len(self.studies) > self.memory_studies:
+                self.studies.popitem(last=False)
+        return faults
+
+    def get_status(self):
+        with self.lock:
+            return {"status": "ok", "parser_version": PARSER_VERSION, "uptime_seconds": round(time.time() - self.started, 1),
+                    "requests": self.requests, "studies_in_memory": len(self.studies)}
+
+def encode_faults(faults, response_format):
+    """ Encodes fault data as an Arrow IPC stream, which keeps the column types, or as JSON columns & rows. Returns the body & content type. """
+    # float32 measurements are widened to their parsed values, e.g. 0.232 rather than 0.2319999933
+    faults = apply_fault_schema(faults)
+    if response_format == "json":
+        return faults.to_json(orient="split", index=False).encode("utf-8"), "application/json"
+    import pyarrow as pa
+    table = pa.Table.from_pandas(faults, schema=get_arrow_schema(faults), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes(), ARROW_STREAM_TYPE
+
+class ParseRequestHandler(http.server.BaseHTTPRequestHandler):
+    """ GET /health: the service status. POST /parse {"path", "curve": "distance" | "overcurrent" | null, "relay_column", "format": "arrow" | "json"}: the fault data. """
+    server_version = "ASPEN-FCA"
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, value):
+        self.send_body(status, json.dumps(value).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self.send_json(404, {"error": f"ERROR: No such endpoint '{self.path}'."})
+        self.send_json(200, self.server.service.get_status())
+
+    def do_POST(self):
+        if self.path != "/parse":
+            return self.send_json(404, {"error": f"ERROR: No such endpoint '{self.path}'."})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            tty_path = request["path"]
+            curve_type = SERVICE_CURVES[request.get("curve")]
+            response_format = request.get("format", "arrow")
+            if response_format not in ("arrow", "json"):
+                raise ValueError(response_format)
+        except (ValueError, KeyError, TypeError) as e:
+            return self.send_json(400, {"error": f"ERROR: Bad parse request: {type(e).__name__}: {e}"})
+        try:
+            faults = self.server.service.parse(tty_path, curve_type, bool(request.get("relay_column", False)))
+            body, content_type = encode_faults(faults, response_format)
+        except FileNotFoundError as e:
+            return self.send_json(404, {"error": str(e)})
+        except ValueError as e:
+            return self.send_json(422, {"error": str(e)})
+        self.send_body(200, body, content_type)
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, cache_dir=None, memory_studies=SERVICE_MEMORY_STUDIES, metrics=None):
+    """ Runs the parse service until stopped. Its packages are imported before the first request. """
+    for package in REQUIRED_PACKAGES + ("pyarrow",):
+        importlib.import_module(package)
+    server = http.server.ThreadingHTTPServer((host, port), ParseRequestHandler)
+    server.service = ParseService(cache_dir, memory_studies, metrics)
+    print(f"Parse service listening on http://{host}:{server.server_port}. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Parse service stopped.")
+    finally:
+        server.server_close()
+    return 0
+
+def request_faults(tty_path, curve_type=None, relay_column=False, address=f"http://{SERVICE_HOST}:{SERVICE_PORT}", timeout=600):
+    """ Gets the fault data of a TTY text file from a running parse service as a DataFrame """
+    import pyarrow as pa
+    curve = {value: name for name, value in SERVICE_CURVES.items()}[curve_type]
+    body = json.dumps({"path": os.path.abspath(tty_path), "curve": curve, "relay_column": relay_column, "format": "arrow"}).encode("utf-8")
+    request = urllib.request.Request(f"{address}/parse", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = response.read()
+    except urllib.error.HTTPError as e:
+        raise ValueError(json.loads(e.read() or b"{}").get("error", f"ERROR: {e}")) from e
+    return pa.ipc.open_stream(data).read_pandas()
@@ -0,0 +1,181 @@
+"""
+SQLite study store of the fault data of many runs, with indexed queries.
+"""
+import os
+from itertools import repeat
+
+from .metrics import StageMetrics
+from .parsing import widen_measurements
+
+# Column of the study store faults table for each fault data column
+STORE_COLUMNS = {
+    "Fault #": "fault_num",
+    "Fault Sim": "fault_sim",
+    "Faulted Line": "faulted_line",
+    "Fault Type": "fault_type",
+    "Branch Outage": "branch_outage",
+    "Operate Time (s)": "operate_time",
+    "Operate Zone": "operate_zone",
+    "Impedance (Magnitude - Ohms secondary)": "impedance_magnitude",
+    "Impedance (Angle)": "impedance_angle",
+    "Fault Current (3I0 - A)": "fault_current"
+}
+# Text columns are stored once in the texts table & referenced by id, which keeps rows & indexes small
+STORE_TEXT_COLUMNS = ("Fault Sim", "Faulted Line", "Fault Type", "Branch Outage", "Operate Zone")
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    relay TEXT,
+    stored TEXT NOT NULL,
+    faults INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS faults (
+    study_id INTEGER NOT NULL REFERENCES studies(id) ON DELETE CASCADE,
+    fault_num INTEGER NOT NULL,
+    fault_sim INTEGER REFERENCES texts(id),
+    faulted_line INTEGER REFERENCES texts(id),
+    fault_type INTEGER REFERENCES texts(id),
+    branch_outage INTEGER REFERENCES texts(id),
+    operate_time REAL,
+    operate_zone INTEGER REFERENCES texts(id),
+    impedance_magnitude REAL,
+    impedance_angle REAL,
+    fault_current REAL
+);
+CREATE INDEX IF NOT EXISTS studies_stored ON studies(stored);
+CREATE INDEX IF NOT EXISTS studies_relay ON studies(relay);
+CREATE INDEX IF NOT EXISTS faults_study ON faults(study_id);
+CREATE INDEX IF NOT EXISTS faults_faulted_line ON faults(faulted_line);
+CREATE INDEX IF NOT EXISTS faults_fault_type ON faults(fault_type);
+CREATE INDEX IF NOT EXISTS faults_branch_outage ON faults(branch_outage);
+CREATE INDEX IF NOT EXISTS faults_operate_zone ON faults(operate_zone);
+"""
+# Filters of query_store & the column each one matches
+STORE_FILTERS = {
+    "faulted_line": "faults.faulted_line",
+    "fault_type": "faults.fault_type",
+    "branch_outage": "faults.branch_outage",
+    "operate_zone": "faults.operate_zone",
+    "fault_sim": "faults.fault_sim",
+    "relay": "studies.relay",
+    "source": "studies.source"
+}
+# Filters that match few faults of a study, in the order they are preferred to lead a query
+STORE_SELECTIVE_FILTERS = ("faulted_line", "branch_outage")
+STORE_STATS = ("count", "max", "min", "avg")
+# Measures of query statistics on the command line
+STORE_MEASURES = {
+    "time": "Operate Time (s)",
+    "impedance": "Impedance (Magnitude - Ohms secondary)",
+    "angle": "Impedance (Angle)",
+    "current": "Fault Current (3I0 - A)"
+}
+
+def open_store(store_path):
+    """ Opens the SQLite study store, creating its tables & indexes """
+    import sqlite3
+    # Batch & watch workers write to the same store, one transaction at a time
+    connection = sqlite3.connect(store_path, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(STORE_SCHEMA)
+    return connection
+
+def get_text_ids(connection, values):
+    """ Gets {text: id} for text values of the store, adding the new ones """
+    connection.executemany("INSERT OR IGNORE INTO texts (text) VALUES (?)", ((value,) for value in values))
+    return {value: connection.execute("SELECT id FROM texts WHERE text = ?", (value,)).fetchone()[0] for value in values}
+
+def get_store_values(connection, series):
+    """ Gets the values of a fault data column as Python values for sqlite3. Measurements are at the decimal values they were parsed from,
+    text is stored by id without the padding of the TTY text, so queries can match it exactly. NaN & missing text are stored as NULL. """
+    if series.dtype.kind == "f":
+        return widen_measurements(series).tolist()
+    if series.dtype.kind in "iu":
+        return series.tolist()
+    if series.dtype != "category":
+        series = series.astype("category")
+    # Look up each category once, -1 codes pick the None at the end
+    categories = [str(category).strip() for category in series.cat.categories]
+    text_ids = get_text_ids(connection, set(categories))
+    category_ids = [text_ids[category] for category in categories] + [None]
+    return [category_ids[code] for code in series.cat.codes.tolist()]
+
+def store_faults(store_path, dataframe, source, relay=None, metrics=None):
+    """ Adds the fault data of a fault study to the study store in one transaction. Returns the id of the study. """
+    from datetime import datetime
+    metrics = metrics or StageMetrics()
+    if relay is None:
+        relay = dataframe.attrs.get("relay") or (str(dataframe["Relay"].iloc[0]) if "Relay" in dataframe.columns and len(dataframe) else None)
+    with metrics.stage("store", path=str(store_path), rows=len(dataframe)) as record:
+        columns = [column for column in STORE_COLUMNS if column in dataframe.columns]
+        connection = open_store(store_path)
+        try:
+            with connection:
+                study_id = connection.execute("INSERT INTO studies (source, relay, stored, faults) VALUES (?, ?, ?, ?)",
+                                              (os.path.abspath(source), relay, datetime.now().isoformat(timespec="seconds"), len(dataframe))).lastrowid
+                values = [get_store_values(connection, dataframe[column]) for column in columns]
+                connection.executemany(f"INSERT INTO faults (study_id, {', '.join(STORE_COLUMNS[column] for column in columns)}) VALUES (?{', ?' * len(columns)})",
+                                       zip(repeat(study_id), *values))
+        finally:
+            connection.close()
+        record["study_id"] = study_id
+    return study_id
+
+def query_store(store_path, stat=None, measure="Operate Time (s)", since=None, before=None, **filters):
+    """ Queries the fault data of every fault study in the study store.
+    filters (see STORE_FILTERS) match exactly, or as a pattern when the value has a *. since & before limit when the studies were stored, e.g. "2026-01-01".
+    Returns the matching faults with their study as a DataFrame, or with a stat ("count", "max", "min" or "avg") its value over the measure. """
+    unknown_filters = set(filters) - set(STORE_FILTERS)
+    if unknown_filters:
+        raise ValueError(f"ERROR: Unknown filters: {', '.join(sorted(unknown_filters))}")
+    if stat is not None and stat not in STORE_STATS:
+        raise ValueError(f"ERROR: Unknown statistic '{stat}'")
+    if measure not in STORE_COLUMNS:
+        raise ValueError(f"ERROR: Unknown measure '{measure}'")
+    # The store keeps no index statistics, so the most selective filter leads & unary + keeps the other indexes out of the plan
+    lead_filter = next((name for name in STORE_SELECTIVE_FILTERS if filters.get(name) is not None), None)
+    conditions = []
+    parameters = []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        column = STORE_FILTERS[name] if lead_filter in (None, name) else f"+{STORE_FILTERS[name]}"
+        # GLOB keeps the index usable for prefixes, e.g. "12 BUS12*"
+        operator = "GLOB" if "*" in value else "="
+        if STORE_FILTERS[name].startswith("faults."):
+            conditions.append(f"{column} IN (SELECT id FROM texts WHERE text {operator} ?)")
+        else:
+            conditions.append(f"{column} {operator} ?")
+        parameters.append(value)
+    stored = "+studies.stored" if lead_filter else "studies.stored"
+    if since:
+        conditions.append(f"{stored} >= ?")
+        parameters.append(str(since))
+    if before:
+        conditions.append(f"{stored} < ?")
+        parameters.append(str(before))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    connection = open_store(store_path)
+    try:
+        if stat is not None:
+            expression = "COUNT(*)" if stat == "count" else f"{stat.upper()}(faults.{STORE_COLUMNS[measure]})"
+            return connection.execute(f"SELECT {expression} FROM faults JOIN studies ON studies.id = faults.study_id{where}", parameters).fetchone()[0]
+        import pandas as pd
+        # Text ids are replaced by their text as the rows are read
+        texts = dict(connection.execute("SELECT id, text FROM texts"))
+        cursor = connection.execute(f"SELECT studies.id, studies.source, studies.relay, studies.stored, {', '.join(f'faults.{name}' for name in STORE_COLUMNS.values())} "
+                                    f"FROM faults JOIN studies ON studies.id = faults.study_id{where} ORDER BY studies.id, faults.rowid", parameters)
+        dataframe = pd.DataFrame(cursor.fetchall(), columns=["Study", "Source", "Relay", "Stored", *STORE_COLUMNS])
+    finally:
+        connection.close()
+    for column in STORE_TEXT_COLUMNS:
+        dataframe[column] = dataframe[column].map(texts).astype("category")
+    # Only the measurements of the curve types stored
+    return dataframe.drop(columns=[column for column in STORE_COLUMNS if dataframe[column].isna().all()])
@@ -0,0 +1,103 @@
+"""
+Captures the relay operations of several relays in one ASPEN OneLiner session into one workbook.
+"""
+import os
+import re
+from pathlib import Path
+
+from .analysis import COORDINATION_CTI, coordinate_faults, get_coordination_cells, summarize_faults
+from .automation import OneLinerMenuError, PywinautoBackend, capture_relay
+from .batch import process_tty_file
+from .excel import get_sheet_name, write_xlsx_sheets
+from .metrics import StageMetrics
+from .parsing import concat_faults
+
+def sweep_ASPEN(relays, xlsx_path, tty_dir=None, backend=None, workers=None, cache_dir=None, metrics=None, store_path=None, pairs=(), cti=COORDINATION_CTI, zone_timers=None):
+    """ Captures every relay in one ASPEN OneLiner session into one workbook, one sheet per relay.
+    Each capture is parsed in a worker process while the next relay is driven. Each (primary, backup) relay pair is checked on a Coordination sheet.
+    Returns the relays that failed. """
+    from concurrent.futures import ProcessPoolExecutor
+    if backend is None:
+        backend = PywinautoBackend()
+    metrics = metrics or StageMetrics()
+    tty_dir = Path(tty_dir or Path(xlsx_path).parent)
+    os.makedirs(tty_dir, exist_ok=True)
+
+    # One connection for the whole sweep
+    with metrics.stage("automation_connect", backend=type(backend).__name__):
+        backend.connect()
+
+    failed_relays = []
+    parsing = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for relay in relays:
+            # File names cannot contain <>:"/\|?*
+            file_name = re.sub(r'[<>:"/\\|?*]', "_", relay)
+            tty_path = tty_dir / f"{file_name} - TTY.txt"
+            print(f"Capturing relay {relay}...")
+            try:
+                with metrics.stage("automation_capture", relay=relay) as record:
+                    record["distance_curve"] = capture_relay(backend, relay, tty_path)
+            except (OneLinerMenuError, TimeoutError) as e:
+                print(f"ERROR: {relay}: {e}")
+                failed_relays.append(relay)
+                continue
+            parsing.append((relay, pool.submit(process_tty_file, tty_path, None, cache_dir, True, None, None, store_path, relay)))
+
+        sheets = {}
+        summaries = []
+        relay_faults = {}
+        # Keep the statistics & coordination sheet names free
+        used_names = {"relay statistics", "coordination"}
+        for relay, future in parsing:
+            fault_count, faults, error, records = future.result()
+            for record in records:
+                metrics.emit(dict(record, relay=relay))
+            if error:
+                print(f"ERROR: {relay}: {error}")
+                failed_relays.append(relay)
+                continue
+            sheets[get_sheet_name(relay, used_names)] = faults
+            relay_faults[relay] = faults
+            with metrics.stage("summary", relay=relay, rows=len(faults)):
+                summary = summarize_faults(faults)
+                summary.insert(0, "Relay", relay)
+                summaries.append(summary)
+            print(f"{relay}: {fault_count} faults")
+
+    relay_count = len(sheets)
+    if sheets:
+        import pandas as pd
+        sheets["Relay Statistics"] = pd.concat(summaries, ignore_index=True)
+        summary_cells = None
+        reports = []
+        totals = {}
+        for primary, backup in pairs:
+            missing = [relay for relay in (primary, backup) if relay not in relay_faults]
+            if missing:
+                print(f"ERROR: Coordination of {primary} & {backup} not checked, {', '.join(missing)} not captured.")
+                continue
+            with metrics.stage("coordinate", primary=primary, backup=backup) as record:
+                try:
+                    report, counts = coordinate_faults(relay_faults[primary], relay_faults[backup], cti, zone_timers)
+                except ValueError as e:
+                    print(f"{primary} & {backup}: {e}")
+                    continue
+                record.update(rows=len(report), **{label.lower().replace(" ", "_"): count for label, count in counts.items()})
+            report.insert(0, "Primary Relay", primary)
+            report.insert(1, "Backup Relay", backup)
+            reports.append(report)
+            for label, count in counts.items():
+                totals[label] = totals.get(label, 0) + count
+            print(f"{primary} & {backup}: {counts['CTI']} CTI violations in {counts['Checked']} faults")
+        if reports:
+            sheets["Coordination"] = concat_faults(reports)
+            summary_cells = {"Coordination": get_coordination_cells(totals)}
+        print("Spreadsheet saved at:", write_xlsx_sheets(xlsx_path, sheets, metrics, summary_cells))
+    print(f"{relay_count} of {len(relays)} relays captured.")
+    return failed_relays
+
+def read_relay_list(path):
+    """ Reads relay names, one per line. Blank lines & lines starting with # are skipped. """
+    with open(path, "r", encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
@@ -0,0 +1,227 @@
+"""
+Parses TTY text files as soon as they are saved in watched folders.
+"""
+import importlib.util
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from .batch import get_summary_path, process_tty_file
+from .export import FORMAT_PACKAGES, REQUIRED_PACKAGES
+from .metrics import StageMetrics
+
+# Seconds a TTY file must stay the same size & age before it is parsed, so partial writes are skipped
+WATCH_DEBOUNCE_SECONDS = 0.25
+# Seconds between folder scans when inotify is not available
+WATCH_POLL_SECONDS = 0.25
+WATCH_WORKERS = 2
+
+def get_file_signature(path):
+    """ Gets the size & modification time of a file, or None if it is gone """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def scan_tty_files(folder):
+    """ Gets {TTY text file: signature} for the TTY text files in a folder """
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return {}
+    signatures = {}
+    for entry in entries:
+        if entry.name.lower().endswith(".txt") and entry.is_file():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            signatures[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    return signatures
+
+class FolderWatcher(ABC):
+    """ Reports TTY text files that are created or written to in watched folders """
+
+    def __init__(self, folders):
+        self.folders = [Path(folder) for folder in folders]
+
+    @abstractmethod
+    def wait_for_changes(self, timeout):
+        """ Waits up to timeout seconds for changes. Returns the TTY text files that may have changed. """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PollingFolderWatcher(FolderWatcher):
+    """ Scans the watched folders for new sizes & modification times. Works on any platform & on network drives. """
+
+    def __init__(self, folders, poll_interval=WATCH_POLL_SECONDS):
+        super().__init__(folders)
+        self.poll_interval = poll_interval
+        self.signatures = {}
+        for folder in self.folders:
+            self.signatures.update(scan_tty_files(folder))
+
+    def wait_for_changes(self, timeout):
+        time.sleep(min(timeout, self.poll_interval))
+        signatures = {}
+        for folder in self.folders:
+            signatures.update(scan_tty_files(folder))
+        changed = [path for path, signature in signatures.items() if self.signatures.get(path) != signature]
+        self.signatures = signatures
+        return changed
+
+class InotifyFolderWatcher(FolderWatcher):
+    """ Waits for Linux inotify events on the watched folders """
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    EVENT_HEADER_SIZE = 16
+
+    def __init__(self, folders):
+        import ctypes
+        import ctypes.util
+        super().__init__(folders)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        for folder in self.folders:
+            watch = libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+            if watch < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"Cannot watch {folder}: {os.strerror(error)}")
+            self.watches[watch] = folder
+
+    def wait_for_changes(self, timeout):
+        import select
+        import struct
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        changed = []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        # Each event is int wd, uint32 mask, cookie & name length, then the NUL padded name
+        offset = 0
+        while offset + self.EVENT_HEADER_SIZE <= len(data):
+            watch, _, _, name_length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + self.EVENT_HEADER_SIZE:offset + self.EVENT_HEADER_SIZE + name_length].rstrip(b"\0")
+            offset += self.EVENT_HEADER_SIZE + name_length
+            if watch in self.watches and name.lower().endswith(b".txt"):
+                path = self.watches[watch] / os.fsdecode(name)
+                if path not in changed:
+                    changed.append(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def get_folder_watcher(folders, polling=False, poll_interval=WATCH_POLL_SECONDS):
+    """ Watches folders with inotify on Linux, or else by scanning them """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyFolderWatcher(folders)
+        except (OSError, AttributeError) as e:
+            print(f"inotify not available, scanning folders instead: {e}")
+    return PollingFolderWatcher(folders, poll_interval)
+
+def start_watch_worker(packages):
+    """ Imports packages in a worker process, so the first TTY file it parses does not pay for them """
+    import signal
+    # Ctrl+C stops the watch in the main process only
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for package in packages:
+        importlib.import_module(package)
+
+def watch_folders(folders, output_dir=None, workers=WATCH_WORKERS, cache_dir=None, metrics=None, output_format="xlsx", compression=None,
+                  debounce=WATCH_DEBOUNCE_SECONDS, polling=False, poll_interval=WATCH_POLL_SECONDS, existing=False, store_path=None):
+    """ Parses TTY text files as soon as they are saved in the folders & writes their summary files, until interrupted.
+    Worker processes stay running with their packages imported between files. """
+    from concurrent.futures import ProcessPoolExecutor
+    metrics = metrics or StageMetrics()
+    folders = [Path(folder) for folder in folders]
+    missing_folders = [str(folder) for folder in folders if not folder.is_dir()]
+    if missing_folders:
+        print(f"ERROR: Folders not found: {', '.join(missing_folders)}")
+        return 1
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    watcher = get_folder_watcher(folders, polling, poll_interval)
+    # TTY file -> signature when it was last parsed; files already there are left alone unless existing is set
+    processed = {}
+    for folder in folders:
+        processed.update(scan_tty_files(folder))
+    # TTY file -> (signature, time it was last seen changing)
+    pending = {path: (None, 0.0) for path in processed} if existing else {}
+    if existing:
+        processed = {}
+    # Future -> (TTY file, signature, output path, time it was last seen changing)
+    running = {}
+
+    packages = REQUIRED_PACKAGES + FORMAT_PACKAGES[output_format]
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=start_watch_worker, initargs=(packages,))
+    # Start the workers now rather than on the first TTY file
+    for _ in range(workers or os.cpu_count() or 1):
+        pool.submit(int)
+    print(f"Watching {', '.join(str(folder) for folder in folders)} for TTY text files ({type(watcher).__name__.replace('FolderWatcher', '').lower()}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            # Wake up in time for the next debounced file or finished worker
+            timeout = poll_interval
+            if pending:
+                timeout = min(timeout, debounce / 2)
+            if running:
+                timeout = min(timeout, 0.05)
+            for path in watcher.wait_for_changes(timeout):
+                pending.setdefault(path, (None, 0.0))
+
+            now = time.monotonic()
+            running_paths = {path for path, _, _, _ in running.values()}
+            for path, (signature, changed_at) in list(pending.items()):
+                current = get_file_signature(path)
+                if current is None:
+                    del pending[path]
+                elif current != signature:
+                    pending[path] = (current, now)
+                elif now - changed_at >= debounce and path not in running_paths:
+                    del pending[path]
+                    if processed.get(path) != current:
+                        output_path = get_summary_path(path, output_dir, output_format, compression)
+                        future = pool.submit(process_tty_file, path, output_path, cache_dir, False, output_format, compression, store_path)
+                        running[future] = (path, current, output_path, changed_at)
+
+            for future in [future for future in running if future.done()]:
+                path, signature, output_path, changed_at = running.pop(future)
+                fault_count, _, error, records = future.result()
+                for record in records:
+                    metrics.emit(record)
+                metrics.emit({"stage": "watch", "tty_file": str(path), "started": time.time(), "seconds": time.monotonic() - changed_at, "faults": fault_count, "error": error or None})
+                # A long-running watch keeps no history of its records
+                metrics.records.clear()
+                processed[path] = signature
+                if error:
+                    print(f"ERROR: {path}: {error}")
+                else:
+                    print(f"{path}: {fault_count} faults -> {output_path}")
+                # Saved again while it was being parsed
+                if get_file_signature(path) != signature:
+                    pending.setdefault(path, (None, 0.0))
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+        return 0
+    finally:
+        watcher.close()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,139 @@
+"""
+Impedance-plane zone checks of Distance Curve fault data against mho & quadrilateral characteristics.
+"""
+import json
+
+from .analysis import COMPARE_KEY_COLUMNS
+from .parsing import widen_measurements
+
+# Settings each zone characteristic shape needs, in ohms secondary
+ZONE_SHAPE_SETTINGS = {"mho": ("reach",), "quad": ("reach", "resistive")}
+# Characteristic angle of zones without one, in degrees
+ZONE_DEFAULT_ANGLE = 75.0
+# Rows & columns of the impedance density grid
+ZONE_GRID_BINS = 40
+# Size of the density grid compared to the largest zone
+ZONE_GRID_MARGIN = 1.5
+
+def read_zone_settings(path):
+    """ Reads zone characteristics from JSON, e.g. {"angle": 75, "zones": {"Z1": {"shape": "mho", "reach": 8}, "Z2": {"shape": "quad", "reach": 12, "resistive": 10}}}.
+    Zones are listed innermost first. Mho zones may have a reverse "offset" & quadrilateral zones a "reverse" reach. """
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            settings = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"ERROR: '{path}' is not valid JSON: {e}") from e
+    zones = {}
+    for zone, zone_settings in settings.get("zones", {}).items():
+        shape = zone_settings.get("shape")
+        if shape not in ZONE_SHAPE_SETTINGS:
+            raise ValueError(f"ERROR: Zone {zone} has an unknown shape '{shape}', expected mho or quad.")
+        zone_settings = dict({"angle": settings.get("angle", ZONE_DEFAULT_ANGLE), "offset": 0.0, "reverse": 0.0}, **zone_settings)
+        missing = [name for name in ZONE_SHAPE_SETTINGS[shape] if not isinstance(zone_settings.get(name), (int, float))]
+        if missing:
+            raise ValueError(f"ERROR: Zone {zone} has no {', '.join(missing)}.")
+        if not 0 < zone_settings["angle"] < 180:
+            raise ValueError(f"ERROR: Zone {zone} angle must be between 0 & 180 degrees.")
+        zones[zone] = zone_settings
+    if not zones:
+        raise ValueError(f"ERROR: No zones in '{path}'.")
+    return zones
+
+def get_impedance_points(dataframe):
+    """ Converts the impedance magnitude & angle of every fault to resistance & reactance arrays. Faults without an impedance are NaN. """
+    import numpy as np
+    magnitude = widen_measurements(dataframe["Impedance (Magnitude - Ohms secondary)"])
+    angle = np.radians(widen_measurements(dataframe["Impedance (Angle)"]))
+    return magnitude * np.cos(angle), magnitude * np.sin(angle)
+
+def mho_contains(r, x, zone):
+    """ Tests points against a mho circle from the reverse offset to the reach, along the zone angle """
+    import numpy as np
+    angle = np.radians(zone["angle"])
+    center = (zone["reach"] - zone["offset"]) / 2
+    radius = (zone["reach"] + zone["offset"]) / 2
+    return np.hypot(r - center * np.cos(angle), x - center * np.sin(angle)) <= radius
+
+def get_quad_vertices(zone):
+    """ Gets the corners of a quadrilateral zone counterclockwise: blinders at -/+ the resistive reach parallel to the zone angle,
+    between the reactance lines through the reverse & forward reaches """
+    import numpy as np
+    angle = np.radians(zone["angle"])
+    cotangent = np.cos(angle) / np.sin(angle)
+    bottom = -zone["reverse"] * np.sin(angle)
+    top = zone["reach"] * np.sin(angle)
+    resistive = zone["resistive"]
+    return [(-resistive + bottom * cotangent, bottom), (resistive + bottom * cotangent, bottom),
+            (resistive + top * cotangent, top), (-resistive + top * cotangent, top)]
+
+def quad_contains(r, x, zone):
+    """ Tests points against a quadrilateral zone """
+    import numpy as np
+    inside = np.ones(len(r), dtype=bool)
+    vertices = get_quad_vertices(zone)
+    for (r1, x1), (r2, x2) in zip(vertices, vertices[1:] + vertices[:1]):
+        # Inside points are left of every counterclockwise edge
+        inside &= (r2 - r1) * (x - x1) - (x2 - x1) * (r - r1) >= 0
+    return inside
+
+ZONE_SHAPES = {"mho": mho_contains, "quad": quad_contains}
+
+def get_impedance_grid(zones, bins=ZONE_GRID_BINS):
+    """ Precomputes the bin edges of a square R-X grid around every zone characteristic """
+    import numpy as np
+    extent = ZONE_GRID_MARGIN * max(zone["reach"] + zone["offset"] + zone["reverse"] + zone.get("resistive", 0.0) for zone in zones.values())
+    return np.linspace(-extent, extent, bins + 1)
+
+def bin_impedance_points(r, x, edges):
+    """ Counts the points in each cell of a grid with the same edges for R & X. Returns the counts, highest X first, & the points off the grid. """
+    import numpy as np
+    bins = len(edges) - 1
+    step = edges[1] - edges[0]
+    columns = np.floor((r - edges[0]) / step)
+    rows = np.floor((x - edges[0]) / step)
+    with np.errstate(invalid="ignore"):
+        on_grid = (columns >= 0) & (columns < bins) & (rows >= 0) & (rows < bins)
+    cells = rows[on_grid].astype(np.intp) * bins + columns[on_grid].astype(np.intp)
+    counts = np.bincount(cells, minlength=bins * bins).reshape(bins, bins)[::-1]
+    return counts, int(np.count_nonzero(~on_grid & ~np.isnan(r) & ~np.isnan(x)))
+
+def check_impedance_zones(dataframe, zones, bins=ZONE_GRID_BINS):
+    """ Tests the impedance of every fault against each zone characteristic, one vectorized test per zone, & bins the faults on an R-X grid.
+    Returns the faults outside the zone they operated in, the density grid & the count of faults in each zone, outside their zone & off the grid. """
+    import numpy as np
+    import pandas as pd
+    if "Impedance (Magnitude - Ohms secondary)" not in dataframe.columns or "Impedance (Angle)" not in dataframe.columns:
+        raise ValueError("ERROR: Zone checks need the impedances of Distance Curve fault data.")
+    r, x = get_impedance_points(dataframe)
+    # One row per zone, plus a last row for faults in no zone
+    inside = np.vstack([ZONE_SHAPES[zone["shape"]](r, x, zone) for zone in zones.values()] + [np.ones(len(r), dtype=bool)])
+    innermost = np.argmax(inside, axis=0)
+    impedance_zones = pd.Categorical.from_codes(np.where(innermost < len(zones), innermost, -1), list(zones))
+
+    outside = np.zeros(len(r), dtype=bool)
+    if "Operate Zone" in dataframe.columns:
+        # Index of each fault's operate zone among the zones by category code, -1 without a characteristic
+        operate_zones = dataframe["Operate Zone"]
+        zone_names = list(zones)
+        lookup = np.array([zone_names.index(str(zone).strip()) if str(zone).strip() in zones else -1 for zone in operate_zones.cat.categories] + [-1])
+        expected = lookup[operate_zones.cat.codes.to_numpy()]
+        checked = expected >= 0
+        outside[checked] = ~inside[expected[checked], np.flatnonzero(checked)]
+
+    columns = [column for column in ("Fault #", "Relay") + COMPARE_KEY_COLUMNS + ("Operate Zone", "Operate Time (s)") if column in dataframe.columns]
+    report = dataframe.loc[outside, columns].reset_index(drop=True)
+    report["Impedance (Magnitude - Ohms secondary)"] = widen_measurements(dataframe["Impedance (Magnitude - Ohms secondary)"])[outside]
+    report["Impedance (Angle)"] = widen_measurements(dataframe["Impedance (Angle)"])[outside]
+    report["R (Ohms secondary)"] = np.round(r[outside], 4)
+    report["X (Ohms secondary)"] = np.round(x[outside], 4)
+    report["Impedance Zone"] = impedance_zones[outside]
+
+    edges = get_impedance_grid(zones, bins)
+    counts, off_grid = bin_impedance_points(r, x, edges)
+    centers = np.round((edges[:-1] + edges[1:]) / 2, 3)
+    density = pd.DataFrame(counts, columns=centers.tolist())
+    density.insert(0, "X \\ R (Ohms secondary)", centers[::-1])
+
+    zone_counts = {f"In {zone}": int(count) for zone, count in zip(zones, inside[:-1].sum(axis=1))}
+    zone_counts.update({"Outside Operate Zone": int(outside.sum()), "Off Grid": off_grid})
+    return report, density, zone_counts
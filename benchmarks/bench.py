@@ -0,0 +1,171 @@
+"""
+Times the parse & export stages of ASPEN FCA on synthetic TTY text and flags regressions against stored baselines.
+Usage: python bench.py [--sizes 10 1000 100000 1000000] [--curves distance overcurrent] [--update-baselines]
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tty_generator import write_tty_file
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_SIZES = (10, 1000, 100000)
+# Allowed slowdown / growth before a result counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Stages faster than this are too noisy to compare times
+MIN_COMPARED_SECONDS = 0.01
+
+def load_fca(module="aspen_fca"):
+    """ Imports the ASPEN FCA package, or one of its modules, from this repository """
+    if str(REPO_PATH) not in sys.path:
+        sys.path.insert(0, str(REPO_PATH))
+    return importlib.import_module(module)
+
+def get_peak_rss_mb():
+    """ Gets the peak resident memory of this process in MB, or None if it cannot be read """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1 << 20)
+    except (ImportError, AttributeError):
+        return None
+
+def time_stage(stage, repeat, function, *args):
+    """ Runs a stage repeat times. Returns its last result & the stage record with the best time. """
+    best_seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    # Peak RSS is the high-water mark of the process once the stage has run
+    return result, {"stage": stage, "seconds": best_seconds, "peak_rss_mb": get_peak_rss_mb()}
+
+def run_stages(fault_count, curve, repeat, work_dir):
+    """ Runs every stage on one synthetic TTY file in this process. Returns the stage records. """
+    fca = load_fca()
+    distance = curve == "distance"
+    tty_path = write_tty_file(Path(work_dir) / f"tty_{curve}_{fault_count}.txt", fault_count, distance)
+    description_lines, table_lines = fca.split_fault_section(fca.read_fault_section(tty_path, ["Fault description:"]))
+
+    records = []
+    descriptions, record = time_stage("get_fault_descriptions", repeat, fca.get_fault_descriptions, description_lines)
+    records.append(record)
+    fault_table, record = time_stage("get_fault_table", repeat, fca.get_fault_table, table_lines, distance)
+    records.append(record)
+    faults, record = time_stage("merge", repeat, fca.merge_faults, descriptions, fault_table)
+    records.append(record)
+    # write_xlsx is create_xlsx without the file name dialog; each run writes a new spreadsheet.
+    # The Fault Statistics sheet is left out, as summarize_faults is timed on its own.
+    xlsx_paths = iter(Path(work_dir) / f"summary_{number}.xlsx" for number in range(repeat))
+    _, record = time_stage("write_xlsx", repeat, lambda: fca.write_xlsx(next(xlsx_paths), faults, statistics_sheet=None))
+    records.append(record)
+    # Timed last, so its memory is not counted in the peak RSS of the stages before it
+    _, record = time_stage("summarize_faults", repeat, fca.summarize_faults, faults)
+    records.append(record)
+
+    for record in records:
+        record.update(curve=curve, faults=fault_count, faults_per_s=fault_count / record["seconds"] if record["seconds"] else None)
+    return records
+
+def run_case(fault_count, curve, repeat):
+    """ Runs the stages for one size & curve in a fresh process, so peak RSS is not carried over from other cases """
+    with tempfile.TemporaryDirectory(prefix="aspen_fca_bench_") as work_dir:
+        command = [sys.executable, __file__, "--case", str(fault_count), curve, "--repeat", str(repeat), "--work-dir", work_dir]
+        result = subprocess.run(command, capture_output=True, text=True, cwd=Path(__file__).resolve().parent)
+    if result.returncode:
+        raise RuntimeError(f"Benchmark case {curve}/{fault_count} failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+def run_startup_case():
+    """ Measures the import time of the command line """
+    total_ms, _ = load_fca("aspen_fca.cli").measure_startup()
+    return {"stage": "startup", "curve": "-", "faults": 0, "seconds": total_ms / 1000, "peak_rss_mb": None, "faults_per_s": None}
+
+def get_key(record):
+    return f"{record['curve']}/{record['faults']}/{record['stage']}"
+
+def find_regressions(records, baselines, tolerance):
+    """ Compares records to the stored baselines. Returns a message for each regression. """
+    regressions = []
+    for record in records:
+        baseline = baselines.get(get_key(record))
+        if not baseline:
+            continue
+        if max(record["seconds"], baseline["seconds"]) < MIN_COMPARED_SECONDS:
+            pass
+        elif record["faults_per_s"] and baseline.get("faults_per_s") and record["faults_per_s"] < baseline["faults_per_s"] * (1 - tolerance):
+            regressions.append(f"{get_key(record)}: {record['faults_per_s']:,.0f} faults/s, baseline {baseline['faults_per_s']:,.0f}")
+        elif record["stage"] == "startup" and record["seconds"] > baseline["seconds"] * (1 + tolerance):
+            regressions.append(f"{get_key(record)}: {record['seconds'] * 1000:.1f} ms, baseline {baseline['seconds'] * 1000:.1f}")
+        if record["peak_rss_mb"] and baseline.get("peak_rss_mb") and record["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{get_key(record)}: peak RSS {record['peak_rss_mb']:.0f} MB, baseline {baseline['peak_rss_mb']:.0f} MB")
+    return regressions
+
+def print_records(records):
+    print(f"{'case':<44}{'seconds':>10}{'faults/s':>14}{'peak RSS MB':>14}")
+    for record in records:
+        faults_per_s = f"{record['faults_per_s']:,.0f}" if record["faults_per_s"] else "-"
+        peak_rss = f"{record['peak_rss_mb']:.0f}" if record["peak_rss_mb"] else "-"
+        print(f"{get_key(record):<44}{record['seconds']:>10.4f}{faults_per_s:>14}{peak_rss:>14}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the ASPEN FCA parse & export stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Fault counts to benchmark (default: 10 1000 100000)")
+    parser.add_argument("--curves", nargs="+", choices=("distance", "overcurrent"), default=("distance", "overcurrent"))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the best time is kept (default: 3)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown / memory growth (default: 0.25)")
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="Stored baselines (default: baselines.json)")
+    parser.add_argument("--update-baselines", action="store_true", help="Store these results as the new baselines")
+    parser.add_argument("--output", help="Also write the results to a JSON file")
+    parser.add_argument("--case", nargs=2, metavar=("FAULTS", "CURVE"), help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        # Child process for one case: progress messages go to stderr, results to stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            records = run_stages(int(args.case[0]), args.case[1], args.repeat, args.work_dir)
+        print(json.dumps(records))
+        return 0
+
+    records = [run_startup_case()]
+    for curve in args.curves:
+        for fault_count in args.sizes:
+            print(f"Benchmarking {curve} curve, {fault_count} faults...", file=sys.stderr)
+            records += run_case(fault_count, curve, args.repeat)
+    print_records(records)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(records, file, indent=2)
+
+    baselines_path = Path(args.baselines)
+    baselines = json.loads(baselines_path.read_text(encoding="utf-8")) if baselines_path.exists() else {}
+    if args.update_baselines:
+        baselines.update({get_key(record): {key: record[key] for key in ("seconds", "faults_per_s", "peak_rss_mb")} for record in records})
+        baselines_path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Baselines saved at: {baselines_path}")
+        return 0
+
+    regressions = find_regressions(records, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if not regressions:
+        print("No regressions against the stored baselines.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
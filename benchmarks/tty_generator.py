@@ -0,0 +1,89 @@
+"""
+Writes synthetic ASPEN OneLiner TTY window text for benchmarks, in the Distance or Overcurrent Curve format.
+Usage: python tty_generator.py OUTPUT.txt --faults 100000 --curve overcurrent
+"""
+import argparse
+import random
+
+# Relative share of each fault simulation in the Fault description section
+FAULT_SIMS = (("Bus Fault", 2), ("Close-In Fault", 3), ("Close-In Fault with end opened", 1), ("Interm. Fault", 3), ("Line-End Fault", 2))
+FAULT_TYPES = ("1LG Type=A", "1LG Type=B", "2LG Type=B-C", "LL Type=B-C", "LL Type=C-A", "3LG")
+ZONES = ("Z1", "Z2", "Z3")
+# Share of faults simulated with a branch outage
+BRANCH_OUTAGE_RATE = 0.25
+
+def get_buses(rng, bus_count=400):
+    """ Makes a list of bus names with their voltages """
+    voltages = ("345.kV", "230.kV", "138.kV", "69.kV")
+    return [f"{number} {'BUS' + str(number):<8} {rng.choice(voltages)}" for number in range(1, bus_count + 1)]
+
+def generate_description_lines(rng, fault_count, buses):
+    """ Yields the Fault description section """
+    sims = [name for name, weight in FAULT_SIMS for _ in range(weight)]
+    yield "Fault description:"
+    for fault_num in range(1, fault_count + 1):
+        sim = rng.choice(sims)
+        fault_type = rng.choice(FAULT_TYPES)
+        bus, far_bus = rng.sample(buses, 2)
+        end_opened = sim.endswith("with end opened")
+        if sim == "Bus Fault":
+            line = f"{fault_num:>4}. Bus Fault on:  {bus} {fault_type}"
+        elif sim == "Interm. Fault":
+            line = f"{fault_num:>4}. Interm. Fault on:  {bus} - {far_bus} {rng.randint(1, 9)}L {fault_type} ({rng.randint(1, 99)}.00%)"
+        else:
+            line = f"{fault_num:>4}. {sim.replace(' with end opened', '')} on:  {bus} - {far_bus} {rng.randint(1, 9)}L {fault_type}"
+        yield line
+        if end_opened:
+            yield "      with end opened"
+        if rng.random() < BRANCH_OUTAGE_RATE:
+            outage_bus, outage_far_bus = rng.sample(buses, 2)
+            yield f"      Branch outage: {outage_bus} - {outage_far_bus} {rng.randint(1, 9)}L"
+
+def generate_table_lines(rng, fault_count, distance, faults_per_block):
+    """ Yields the relay operations table, one 4 line block per faults_per_block faults """
+    for block_start in range(1, fault_count + 1, faults_per_block):
+        fault_nums = range(block_start, min(block_start + faults_per_block, fault_count + 1))
+        yield "RELAY NAME  " + "".join(f"Fault {fault_num:>2}".ljust(20) for fault_num in fault_nums)
+        yield "-" * (12 + 20 * len(fault_nums))
+        if distance:
+            yield "NEVADA G1   " + "".join(f"{rng.choice(ZONES)}: {rng.uniform(0.0, 2.0):.3f}s".ljust(20) for _ in fault_nums)
+            yield "            " + "".join(f"{rng.uniform(0.1, 99.9):.3f}@ {rng.uniform(-90.0, 90.0):.1f}".ljust(20) for _ in fault_nums)
+        else:
+            yield "NEVADA G1   " + "".join(f"{rng.uniform(100.0, 99999.9):.1f}A".ljust(20) for _ in fault_nums)
+            yield "            " + "".join(f"{rng.uniform(0.0, 2.0):.3f}s".ljust(20) for _ in fault_nums)
+        yield ""
+
+def generate_tty_lines(fault_count, distance=True, seed=0, faults_per_block=4, earlier_studies=1):
+    """ Yields TTY window text lines. Earlier fault studies come first, like a TTY window that was not cleared. """
+    rng = random.Random(seed)
+    buses = get_buses(rng)
+    yield "ASPEN OneLiner TTY window"
+    for study_count in (min(fault_count, 10),) * earlier_studies + (fault_count,):
+        yield ""
+        yield from generate_description_lines(rng, study_count, buses)
+        yield ""
+        yield from generate_table_lines(rng, study_count, distance, faults_per_block)
+
+def write_tty_file(path, fault_count, distance=True, seed=0, faults_per_block=4, earlier_studies=1):
+    """ Writes synthetic TTY window text to a file """
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as file:
+        for line in generate_tty_lines(fault_count, distance, seed, faults_per_block, earlier_studies):
+            file.write(line)
+            file.write("\n")
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Writes synthetic ASPEN OneLiner TTY window text.")
+    parser.add_argument("output", help="TTY text file to write")
+    parser.add_argument("--faults", type=int, default=1000, help="Number of faults in the last fault study (default: 1000)")
+    parser.add_argument("--curve", choices=("distance", "overcurrent"), default="distance", help="Relay curve output format (default: distance)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--per-block", type=int, default=4, help="Faults per relay operations block (default: 4)")
+    parser.add_argument("--earlier-studies", type=int, default=1, help="Fault studies before the last one (default: 1)")
+    args = parser.parse_args(argv)
+    write_tty_file(args.output, args.faults, args.curve == "distance", args.seed, args.per_block, args.earlier_studies)
+    print(f"{args.faults} faults written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
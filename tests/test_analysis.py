@@ -0,0 +1,61 @@
+"""
+Checks the fault study comparison & relay coordination of measurements right at their thresholds.
+Usage: python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+if str(REPO_PATH) not in sys.path:
+    sys.path.insert(0, str(REPO_PATH))
+
+from aspen_fca.analysis import compare_faults, coordinate_faults, summarize_faults
+
+def make_faults(operate_times, dtype="float32"):
+    """ Makes fault data with one Close-In Fault per operate time, like a parsed Overcurrent Curve study """
+    count = len(operate_times)
+    return pd.DataFrame({
+        "Fault #": np.arange(1, count + 1, dtype="int32"),
+        "Fault Sim": pd.Categorical(["Close-In Fault"] * count),
+        "Faulted Line": pd.Categorical([f"BUS{number} - BUS{number + 1} 1L" for number in range(count)]),
+        "Fault Type": pd.Categorical(["3LG"] * count),
+        "Branch Outage": pd.Categorical([""] * count),
+        "Operate Time (s)": np.array(operate_times, dtype=dtype),
+    })
+
+# Primary & backup operate times exactly one 0.3 s interval apart
+CTI_BOUNDARY_PAIRS = [(0.40, 0.70), (0.10, 0.40), (0.80, 1.10), (0.05, 0.35), (1.234, 1.534)]
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+def test_coordination_at_cti(dtype):
+    primary = make_faults([primary_time for primary_time, _ in CTI_BOUNDARY_PAIRS] + [0.40], dtype)
+    backup = make_faults([backup_time for _, backup_time in CTI_BOUNDARY_PAIRS] + [0.699], dtype)
+    report, counts = coordinate_faults(primary, backup, cti=0.3)
+    assert counts["CTI"] == 1
+    assert report["Violation"].tolist() == [""] * len(CTI_BOUNDARY_PAIRS) + ["CTI"]
+    assert report["CTI (s)"].tolist()[:-1] == [0.3] * len(CTI_BOUNDARY_PAIRS)
+
+# Operate times before & after that change by exactly the 0.01 s threshold
+COMPARE_BOUNDARY_PAIRS = [(0.30, 0.31), (0.35, 0.36), (0.02, 0.03), (1.10, 1.09), (0.57, 0.58)]
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+def test_compare_at_threshold(dtype):
+    before = make_faults([before_time for before_time, _ in COMPARE_BOUNDARY_PAIRS] + [0.30], dtype)
+    after = make_faults([after_time for _, after_time in COMPARE_BOUNDARY_PAIRS] + [0.32], dtype)
+    report, counts = compare_faults(before, after, {"Operate Time (s)": 0.01})
+    assert counts["Operate Time"] == 1
+    assert report["Fault # Before"].tolist() == [len(COMPARE_BOUNDARY_PAIRS) + 1]
+    assert report["Operate Time Change"].tolist() == [0.02]
+
+def test_summary_of_parsed_values():
+    faults = make_faults([0.232, 0.5, 0.7])
+    faults["Impedance (Magnitude - Ohms secondary)"] = np.array([99.356, 12.5, 3.25], dtype="float32")
+    summary = summarize_faults(faults, group_columns=("Faulted Line",))
+    one_fault = summary[summary["Group"] == "BUS0 - BUS1 1L"].iloc[0]
+    for statistic in ("Min", "P10", "P50", "P90", "Max"):
+        assert one_fault[f"{statistic} Impedance (Ohms secondary)"] == 99.356
+    assert one_fault["Min Operate Time (s)"] == 0.232
@@ -0,0 +1,111 @@
+"""
+Checks that sheets merged into existing Excel spreadsheets keep their values, named styles, banded rows & defined names.
+Usage: python -m pytest tests
+"""
+import sys
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+if str(REPO_PATH) not in sys.path:
+    sys.path.insert(0, str(REPO_PATH))
+
+from aspen_fca.excel import append_xlsx_sheets, get_named_styles, write_xlsx_sheets
+
+FAULT_COLUMNS = ["Fault #", "Faulted Line", "Impedance (Magnitude - Ohms secondary)"]
+
+def make_faults(impedances):
+    """ Makes fault data with one fault per impedance """
+    return pd.DataFrame({
+        "Fault #": list(range(1, len(impedances) + 1)),
+        "Faulted Line": [f"BUS{number} - BUS{number + 1} 1L" for number in range(len(impedances))],
+        "Impedance (Magnitude - Ohms secondary)": impedances
+    })
+
+def make_notes_workbook(xlsx_path, conditional_format):
+    """ Saves an openpyxl workbook with one unrelated sheet & a workbook-level and sheet-level defined name """
+    from openpyxl import Workbook
+    from openpyxl.formatting.rule import CellIsRule
+    from openpyxl.styles import Font
+    from openpyxl.workbook.defined_name import DefinedName
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Notes"
+    ws.append(["Study", "Cases"])
+    ws.append(["Close-In Fault", 12])
+    wb.defined_names["Study_Cases"] = DefinedName("Study_Cases", attr_text="Notes!$B$2")
+    ws.defined_names["Study_Name"] = DefinedName("Study_Name", attr_text="Notes!$A$2")
+    if conditional_format:
+        ws.conditional_formatting.add("B2", CellIsRule(operator="greaterThan", formula=["10"], font=Font(color="FF0000")))
+    wb.save(xlsx_path)
+    return xlsx_path
+
+def check_fault_sheet(ws, faults):
+    """ Checks the values, named styles & banded rows of a merged fault data sheet """
+    rows = list(ws.iter_rows(values_only=True))
+    assert list(rows[0][:len(FAULT_COLUMNS)]) == FAULT_COLUMNS
+    assert [row[:len(FAULT_COLUMNS)] for row in rows[1:]] == list(faults.itertuples(index=False, name=None))
+    assert rows[0][len(FAULT_COLUMNS) + 2:len(FAULT_COLUMNS) + 4] == ("Maximum Impedance", max(faults["Impedance (Magnitude - Ohms secondary)"]))
+    assert [cell.style for cell in ws[1][:len(FAULT_COLUMNS)]] == ["Fault Header"] * len(FAULT_COLUMNS)
+    assert ws.cell(1, len(FAULT_COLUMNS) + 3).style == "Fault Summary Label"
+    assert ws.cell(1, len(FAULT_COLUMNS) + 4).style == "Fault Summary Value"
+    assert {cell.style for row in ws.iter_rows(min_row=2, max_col=len(FAULT_COLUMNS)) for cell in row} == {"Fault Row"}
+    assert ws.auto_filter.ref == f"A1:C{len(faults) + 1}"
+    rules = [(str(formatting.sqref), rule) for formatting in ws.conditional_formatting for rule in formatting.rules]
+    assert [(sqref, rule.formula) for sqref, rule in rules] == [(f"A2:C{len(faults) + 1}", ["MOD(ROW(),2)=0"])]
+    assert rules[0][1].dxf.fill.fgColor.rgb == "00D9D9D9"
+
+def check_named_styles(wb):
+    assert {style.name for style in get_named_styles()} <= set(wb.named_styles)
+
+def check_notes_sheet(wb):
+    """ Checks the unrelated sheet & its defined names are kept as they were """
+    ws = wb["Notes"]
+    assert list(ws.iter_rows(values_only=True)) == [("Study", "Cases"), ("Close-In Fault", 12)]
+    assert wb.defined_names["Study_Cases"].attr_text == "Notes!$B$2"
+    assert ws.defined_names["Study_Name"].attr_text == "Notes!$A$2"
+
+def test_merge_with_unrelated_sheet(tmp_path):
+    from openpyxl import load_workbook
+    xlsx_path = make_notes_workbook(tmp_path / "Notes.xlsx", conditional_format=True)
+    faults = make_faults([1.5, 2.5, 3.25])
+    append_xlsx_sheets(xlsx_path, {"Fault Summary": faults})
+    wb = load_workbook(xlsx_path)
+    assert wb.sheetnames == ["Notes", "Fault Summary"]
+    check_notes_sheet(wb)
+    check_named_styles(wb)
+    check_fault_sheet(wb["Fault Summary"], faults)
+    # The existing conditional format keeps its own font
+    notes_rules = [rule for formatting in wb["Notes"].conditional_formatting for rule in formatting.rules]
+    assert notes_rules[0].dxf.font.color.rgb == "00FF0000"
+
+def test_merge_replaces_previous_run(tmp_path):
+    from openpyxl import load_workbook
+    xlsx_path = tmp_path / "Fault Summary.xlsx"
+    write_xlsx_sheets(xlsx_path, {"Before": make_faults([9.0]), "Fault Summary": make_faults([4.0, 5.0]), "After": make_faults([8.0])})
+    faults = make_faults([1.5, 2.5, 3.25])
+    append_xlsx_sheets(xlsx_path, {"Fault Summary": faults})
+    with zipfile.ZipFile(xlsx_path) as workbook_zip:
+        sheet_parts = [name for name in workbook_zip.namelist() if name.startswith("xl/worksheets/sheet")]
+    assert len(sheet_parts) == 3
+    wb = load_workbook(xlsx_path)
+    assert wb.sheetnames == ["Before", "Fault Summary", "After"]
+    check_named_styles(wb)
+    check_fault_sheet(wb["Fault Summary"], faults)
+    check_fault_sheet(wb["After"], make_faults([8.0]))
+
+def test_merge_without_dxfs(tmp_path):
+    from openpyxl import load_workbook
+    xlsx_path = make_notes_workbook(tmp_path / "Notes.xlsx", conditional_format=False)
+    with zipfile.ZipFile(xlsx_path) as workbook_zip:
+        assert b"<dxfs" not in workbook_zip.read("xl/styles.xml")
+    faults = make_faults([1.5, 2.5, 3.25])
+    # Raises instead of loading the whole workbook if the sheets cannot be merged
+    append_xlsx_sheets(xlsx_path, {"Fault Summary": faults})
+    wb = load_workbook(xlsx_path)
+    assert wb.sheetnames == ["Notes", "Fault Summary"]
+    check_notes_sheet(wb)
+    check_named_styles(wb)
+    check_fault_sheet(wb["Fault Summary"], faults)
@@ -0,0 +1,58 @@
+"""
+Runs the capture-to-workbook pipeline end to end against recorded ASPEN OneLiner sessions, without Windows.
+Usage: python -m pytest tests
+"""
+import json
+import sys
+from pathlib import Path
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+if str(REPO_PATH) not in sys.path:
+    sys.path.insert(0, str(REPO_PATH))
+
+from aspen_fca.cli import main
+from aspen_fca.export import read_faults
+
+RECORDINGS_PATH = Path(__file__).resolve().parent / "recordings"
+
+def copy_recording(name, work_dir):
+    """ Copies a recorded session into work_dir, saving its TTY text there & reading its TTY files from the recordings folder """
+    recording = json.loads((RECORDINGS_PATH / name).read_text(encoding="utf-8"))
+    if "tty_file" in recording:
+        recording["tty_file"] = str(RECORDINGS_PATH / recording["tty_file"])
+    for relay in recording.get("relays", []):
+        relay["tty_file"] = str(RECORDINGS_PATH / relay["tty_file"])
+    recording["save_folder"] = str(work_dir)
+    recording_path = Path(work_dir) / name
+    recording_path.write_text(json.dumps(recording), encoding="utf-8")
+    return recording_path
+
+def get_sheet_names(xlsx_path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(xlsx_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def test_replay(tmp_path):
+    xlsx_path = tmp_path / "Replay - Fault Summary.xlsx"
+    assert main(["--no-cache", "replay", str(copy_recording("replay.json", tmp_path)), "--output", str(xlsx_path)]) == 0
+    assert (tmp_path / "TTY Window.txt").exists()
+    assert get_sheet_names(xlsx_path) == ["Fault Summary", "Fault Statistics"]
+    faults = read_faults(xlsx_path)
+    assert len(faults) == 12
+    assert faults["Fault #"].tolist() == list(range(1, 13))
+    assert faults["Operate Zone"].notna().all()
+
+def test_sweep_replay(tmp_path):
+    xlsx_path = tmp_path / "Relay Sweep - Fault Summary.xlsx"
+    recording_path = copy_recording("sweep.json", tmp_path)
+    argv = ["--no-cache", "sweep", "LINE 12 21P", "TX 1 51N", "--replay", str(recording_path), "--output", str(xlsx_path), "--tty-dir", str(tmp_path), "--workers", "1"]
+    assert main(argv) == 0
+    assert get_sheet_names(xlsx_path) == ["LINE 12 21P", "TX 1 51N", "Relay Statistics"]
+    faults = read_faults(xlsx_path)
+    assert faults["Relay"].value_counts().to_dict() == {"LINE 12 21P": 12, "TX 1 51N": 8}
+    distance_faults = faults[faults["Relay"] == "LINE 12 21P"]
+    assert distance_faults["Impedance (Magnitude - Ohms secondary)"].notna().all()
+    assert faults.loc[faults["Relay"] == "TX 1 51N", "Fault Current (3I0 - A)"].notna().all()
@@ -0,0 +1,21 @@
+"""
+Checks that the aspen_fca command line starts within its import time budget & leaves heavy packages to be imported when needed.
+Usage: python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+if str(REPO_PATH) not in sys.path:
+    sys.path.insert(0, str(REPO_PATH))
+
+from aspen_fca.cli import LAZY_PACKAGES, STARTUP_BUDGET_MS, measure_startup
+
+def test_startup_within_budget():
+    total_ms, _ = measure_startup()
+    assert total_ms <= STARTUP_BUDGET_MS, f"Startup imports took {total_ms:.1f} ms, budget {STARTUP_BUDGET_MS} ms"
+
+def test_no_heavy_packages_at_startup():
+    _, imports = measure_startup()
+    eager_packages = sorted({package.split(".")[0] for _, package in imports} & set(LAZY_PACKAGES))
+    assert not eager_packages, f"Imported at startup: {', '.join(eager_packages)}"